@@ -0,0 +1,235 @@
+#----------Imports---------- #
+
+from datetime import datetime
+from flask import Blueprint, abort, current_app, jsonify, request
+from sqlalchemy import func
+from models import db, Venue, Artist, Show
+from queries import after_cursor, browse, decode_cursor, encode_cursor
+from exporter import plain
+import matchmaking
+
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+#----------Fields---------- #
+# `fields=` picks the columns that end up in the SELECT, so clients asking for
+# a few fields never pay for whole ORM rows.
+
+RESOURCES = {
+    "venues": (Venue, Show.venue_id),
+    "artists": (Artist, Show.artist_id),
+}
+
+SHOW_FIELDS = {
+    "id": Show.id,
+    "start_time": Show.start_time,
+    "duration_minutes": Show.duration_minutes,
+    "venue_id": Show.venue_id,
+    "venue_name": Venue.name.label('venue_name'),
+    "venue_image_link": Venue.image_link.label('venue_image_link'),
+    "artist_id": Show.artist_id,
+    "artist_name": Artist.name.label('artist_name'),
+    "artist_image_link": Artist.image_link.label('artist_image_link'),
+}
+
+
+def api_error(status, message):
+    response = jsonify(error=message)
+    response.status_code = status
+    abort(response)
+
+
+def requested_fields(available):
+    fields = request.args.get('fields')
+    if not fields:
+        return list(available)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        api_error(400, f'unknown fields: {", ".join(unknown)}')
+    # The id is always returned so rows can be paged and referenced.
+    return ['id'] + [name for name in names if name != 'id']
+
+
+def includes():
+    include = {name.strip() for name in request.args.get('include', '').split(',') if name.strip()}
+    unknown = include - {'shows'}
+    if unknown:
+        api_error(400, f'unknown include: {", ".join(sorted(unknown))}')
+    return include
+
+
+def limit():
+    size = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(size, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def serialize(names, row):
+    return {name: plain(value) for name, value in zip(names, row)}
+
+
+#----------Shows---------- #
+
+def show_columns(names):
+    return [SHOW_FIELDS[name] for name in names]
+
+
+def show_query(names):
+    query = db.session.query(*show_columns(names))
+    if any(name.startswith('venue_') and name != 'venue_id' for name in names):
+        query = query.join(Venue, Show.venue_id == Venue.id)
+    if any(name.startswith('artist_') and name != 'artist_id' for name in names):
+        query = query.join(Artist, Show.artist_id == Artist.id)
+    return query
+
+
+def shows_for(parent_column, parent_ids, per_parent, now):
+    # One query for the next upcoming shows of every row on the page:
+    # row_number() keeps at most per_parent shows for each parent, and the
+    # windowed count reports how many upcoming shows each parent has in all.
+    counterpart = 'artist' if parent_column is Show.venue_id else 'venue'
+    names = ['id', 'start_time', 'venue_id', 'artist_id',
+             f'{counterpart}_name', f'{counterpart}_image_link']
+    window = dict(partition_by=parent_column)
+    shows = (
+        show_query(names)
+        .add_columns(
+            func.row_number().over(order_by=(Show.start_time, Show.id), **window).label('position'),
+            func.count().over(**window).label('total'),
+        )
+        .filter(parent_column.in_(parent_ids))
+        .filter(Show.start_time > now)
+        .subquery()
+    )
+    key = 'venue_id' if parent_column is Show.venue_id else 'artist_id'
+    rows = (
+        db.session.query(shows)
+        .filter(shows.c.position <= per_parent)
+        .order_by(shows.c[key], shows.c.position)
+    )
+    grouped = {parent_id: list() for parent_id in parent_ids}
+    totals = dict.fromkeys(parent_ids, 0)
+    for row in rows:
+        show = serialize(names, row)
+        grouped[show[key]].append(show)
+        totals[show[key]] = row.total
+    return grouped, totals
+
+
+@api.route('/shows')
+def list_shows():
+    names = requested_fields(SHOW_FIELDS)
+    for key in ('id', 'start_time'):
+        if key not in names:
+            names.append(key)
+    query = show_query(names)
+    cursor = request.args.get('after')
+    if cursor:
+        try:
+            query = after_cursor(query, Show.start_time, Show.id, decode_cursor(cursor))
+        except ValueError:
+            api_error(400, 'invalid cursor')
+    size = limit()
+    rows = query.order_by(Show.start_time, Show.id).limit(size + 1).all()
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+    return jsonify(data=[serialize(names, row) for row in rows], next_cursor=next_cursor)
+
+
+#----------Venues and Artists---------- #
+
+def columns_of(model):
+    return {column.name: getattr(model, column.name) for column in model.__table__.columns}
+
+
+def with_shows(resource, names, rows):
+    _, parent_column = RESOURCES[resource]
+    data = [serialize(names, row) for row in rows]
+    if 'shows' in includes() and data:
+        shows, totals = shows_for(parent_column, [item['id'] for item in data],
+                                  current_app.config['API_SHOWS_PER_PARENT'], datetime.now())
+        for item in data:
+            item['shows'] = shows[item['id']]
+            item['shows_total'] = totals[item['id']]
+    return data
+
+
+@api.route('/<any(venues, artists):resource>')
+def list_resource(resource):
+    model, _ = RESOURCES[resource]
+    available = columns_of(model)
+    names = requested_fields(available)
+    query = db.session.query(*(available[name] for name in names))
+    after = request.args.get('after')
+    if after:
+        if not after.isdigit():
+            api_error(400, 'invalid cursor')
+        query = query.filter(model.id > int(after))
+    size = limit()
+    rows = query.order_by(model.id).limit(size + 1).all()
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = str(rows[-1].id)
+    return jsonify(data=with_shows(resource, names, rows), next_cursor=next_cursor)
+
+
+@api.route('/<any(venues, artists):resource>/browse')
+def browse_resource(resource):
+    # ?genre= (repeatable or comma separated; all must match), city, state,
+    # seeking=true|false and page; facet counts cover every match, not just
+    # the page.
+    model, _ = RESOURCES[resource]
+    genres = [genre.strip() for value in request.args.getlist('genre')
+              for genre in value.split(',') if genre.strip()]
+    seeking = request.args.get('seeking')
+    if seeking is not None:
+        if seeking.lower() not in ('true', 'false', '1', '0'):
+            api_error(400, 'seeking must be true or false')
+        seeking = seeking.lower() in ('true', '1')
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        api_error(400, 'page must be 1 or more')
+    size = limit()
+    data, facets, total = browse(
+        model,
+        genres=genres,
+        city=request.args.get('city'),
+        state=request.args.get('state'),
+        seeking=seeking,
+        page=page,
+        per_page=size,
+    )
+    return jsonify(count=total, data=data, facets=facets, page=page, has_more=page * size < total)
+
+
+@api.route('/<any(venues, artists):resource>/<int:item_id>')
+def get_resource(resource, item_id):
+    model, _ = RESOURCES[resource]
+    available = columns_of(model)
+    names = requested_fields(available)
+    row = db.session.query(*(available[name] for name in names)).filter(model.id == item_id).first()
+    if row is None:
+        api_error(404, f'{resource[:-1]} {item_id} not found')
+    return jsonify(data=with_shows(resource, names, [row])[0])
+
+
+@api.route('/<any(venues, artists):resource>/<int:item_id>/matches')
+def resource_matches(resource, item_id):
+    # Seeking artists for a venue, or seeking venues for an artist, ranked
+    # by genre overlap, location and past shows together.
+    model, _ = RESOURCES[resource]
+    config = current_app.config
+    size = request.args.get('limit', config['MATCH_RESULTS'], type=int)
+    result = matchmaking.matches(
+        model, item_id,
+        limit=max(1, min(size, config['API_MAX_PAGE_SIZE'])),
+        max_entries=config['MATCH_CACHE_ENTRIES'],
+        ttl=config['MATCH_CACHE_TTL'],
+    )
+    if result is None:
+        api_error(404, f'{resource[:-1]} {item_id} not found')
+    return jsonify(result)
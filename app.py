@@ -1,17 +1,38 @@
 #----------Imports---------- #
 import os
 import json
+import functools
+from datetime import date, datetime, timedelta
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, jsonify, stream_with_context
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import SQLAlchemyError
 from flask_migrate import Migrate
 import logging
 from logging import Formatter, FileHandler
+import click
 from flask_wtf import Form
 from forms import *
 from models import *
+from queries import *
+from search import search_names
+from cache import *
+import importer
+import exporter
+from api import api
+from parallel import run_parallel
+import counters
+import scheduling
+import fragments
+import dbpool
+import sqlstats
+from sqlstats import query_budget
+import search
+import matchmaking
+import metrics
 
 
 #----------App Config---------- #
@@ -19,10 +40,23 @@ from models import *
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
+dbpool.track_checkouts(app)
+sqlstats.instrument(app)
 db.init_app(app)
 
 # TODO: connect to a local postgresql database
 migrate = Migrate(app, db)
+detail_cache = make_cache(app.config)
+page_cache = make_cache(app.config)
+fragment_cache = make_cache(app.config)
+fragments.init_app(app, fragment_cache)
+track_catalog_writes(page_cache)
+app.register_blueprint(api)
+prometheus_metrics = metrics.init_app(
+    app,
+    caches={"details": detail_cache, "pages": page_cache, "fragments": fragment_cache},
+    pool_metrics=dbpool.metrics,
+)
 
 #----------Models---------- #
 #  in models.py
@@ -30,16 +64,81 @@ migrate = Migrate(app, db)
 
 #----------Filters---------- #
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+# Views pass datetimes straight from the database. Babel patterns are parsed
+# once, and formatted strings are memoized per (timestamp, format, locale)
+# because listings repeat the same start times on every request.
+
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+  'day': "EEEE MMMM d, y",
+}
+
+@functools.lru_cache(maxsize=None)
+def datetime_pattern(format):
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+
+@functools.lru_cache(maxsize=None)
+def datetime_locale(locale):
+  return babel.Locale.parse(locale)
+
+@functools.lru_cache(maxsize=8192)
+def formatted_datetime(value, format, locale):
+  if value.tzinfo is None:
+    # Same as babel.dates.format_datetime: naive times are shown as-is.
+    value = value.replace(tzinfo=babel.dates.UTC)
+  return datetime_pattern(format).apply(value, datetime_locale(locale))
+
+def format_datetime(value, format='medium', locale=None):
+  if isinstance(value, str):
+    value = dateutil.parser.parse(value)
+  return formatted_datetime(value, format, locale or babel.dates.LC_TIME)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+#----------Helpers---------- #
+
+def page_size(default_key, max_key):
+  limit = request.args.get('limit', app.config[default_key], type=int)
+  return max(1, min(limit, app.config[max_key]))
+
+def page_cursor(name='after'):
+  cursor = request.args.get(name)
+  if not cursor:
+    return None
+  try:
+    return decode_cursor(cursor)
+  except ValueError:
+    abort(400)
+
+def date_range():
+  # ?from= and ?to= as ISO dates or datetimes; a bare `to` date includes
+  # that whole day. Missing bounds default to today and CALENDAR_DEFAULT_DAYS on.
+  try:
+    start = datetime.fromisoformat(request.args['from']) if request.args.get('from') \
+      else datetime.combine(date.today(), datetime.min.time())
+    end = datetime.fromisoformat(request.args['to']) if request.args.get('to') \
+      else start + timedelta(days=app.config['CALENDAR_DEFAULT_DAYS'])
+  except ValueError:
+    abort(400)
+  if request.args.get('to') and 'T' not in request.args['to'] and ' ' not in request.args['to']:
+    end += timedelta(days=1)
+  if end <= start:
+    abort(400)
+  return start, end
+
+def cached_detail(key, build):
+  # Only the first page of a detail view is cached; cursor pages are rare
+  # and would multiply the keys to invalidate.
+  if 'upcoming_after' in request.args or 'past_before' in request.args:
+    return build()
+  key = detail_key(detail_cache, key)
+  data = detail_cache.get(key)
+  if data is None:
+    data = build()
+    detail_cache.set(key, data)
+  return data
+
 #----------Controllers---------- #
 
 @app.route('/')
@@ -50,43 +149,56 @@ def index():
 # Get All Venues
 
 @app.route('/venues')
+@query_budget(1)
+@cached_page(page_cache)
 def venues():
-    # TODO: replace with real venues data.
-    #       num_shows should be aggregated based on number of upcoming shows per venue.
-    all_venues = (
-        db.session.query(Venue.city, Venue.state)
-        .group_by(Venue.city, Venue.state)
-        .all()
+    # venues grouped by city and state, with upcoming show counts per venue
+    page = max(1, request.args.get('page', 1, type=int))
+    data, has_more = venue_areas(
+        page=page,
+        per_page=page_size('AREAS_PER_PAGE', 'AREAS_MAX_PER_PAGE'),
     )
-
-    data = list()
-    for one_venue in all_venues:
-        city_and_state = (
-            Venue.query.filter(Venue.state == one_venue.state)
-            .filter(Venue.city == one_venue.city)
-            .all()
-        )
-        data.append(
-            {"city": one_venue.city, "state": one_venue.state, "venues": city_and_state}
-        )
-    return render_template("pages/venues.html", areas=data)
+    return render_template("pages/venues.html", areas=data, page=page, has_more=has_more)
 
 # Search for Venue
 
 @app.route('/venues/search', methods=['POST'])
+@query_budget(1)
 def search_venues():
   # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
   search_term = request.form.get("search_term", "")
-  result_of_search = Venue.query.filter(Venue.name.ilike(f"%{search_term}%"))
-  response = {"count": result_of_search.count(), "data": result_of_search}
+  response = search_names(Venue, search_term, app.config['SEARCH_RESULTS_LIMIT'])
   return render_template(
         "pages/search_venues.html", results=response, search_term=search_term
     )
 
 #  Create new Venue 
 
+@app.route('/venues/<int:venue_id>/availability')
+@query_budget(2)
+def venue_availability_view(venue_id):
+    # Bookings and free days for one venue, for planning tours:
+    # ?from=YYYY-MM-DD (default today) and ?days= (default CALENDAR_DEFAULT_DAYS)
+    if db.session.query(Venue.id).filter(Venue.id == venue_id).first() is None:
+        abort(404)
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+    except ValueError:
+        abort(400)
+    days = request.args.get('days', app.config['CALENDAR_DEFAULT_DAYS'], type=int)
+    days = max(1, min(days, app.config['CALENDAR_MAX_DAYS']))
+    calendar = venue_availability(
+        venue_id, start, days,
+        lookback=timedelta(minutes=app.config['SHOW_MAX_DURATION_MINUTES']),
+    )
+    for day in calendar:
+        day['date'] = day['date'].isoformat()
+        for booking in day['bookings']:
+            booking.update((key, exporter.plain(value)) for key, value in booking.items())
+    return jsonify(venue_id=venue_id, days=calendar)
+
 @app.route('/venues/create', methods=['GET'])
 def create_venue_form():
   form = VenueForm()
@@ -128,38 +240,18 @@ def create_venue_submission():
    
 # GET A Venue by id  
 
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-    # shows the venue page with the given venue_id
-    # TODO: replace with real venue data from the venues table, using venue_id
-    venues = Venue.query.filter(Venue.id == venue_id).first_or_404()
-    all_shows = (
-        db.session.query(
-            Venue.id.label('venue_id'),
-            Artist.id.label('artist_id'),
-            Artist.name,
-            Artist.image_link,
-            Show.start_time,
-        )
-        .join(Artist, Show.artist_id == Artist.id)
-        .join(Venue, Show.venue_id == Venue.id)
-        .filter(Venue.id == venue_id)
-        .all()
+def venue_detail(venue_id):
+    now = datetime.now()
+    limit = app.config['DETAIL_SHOWS_PER_PAGE']
+    upcoming_after = page_cursor('upcoming_after')
+    past_before = page_cursor('past_before')
+    # The four queries are independent, so they may run side by side.
+    venues, (upcoming_count, past_count), (upcoming_shows, upcoming_cursor), (past_shows, past_cursor) = run_parallel(
+        lambda: Venue.query.filter(Venue.id == venue_id).first_or_404(),
+        lambda: show_counts(Show.venue_id, venue_id, now),
+        lambda: venue_shows(venue_id, now, upcoming=True, limit=limit, cursor=upcoming_after),
+        lambda: venue_shows(venue_id, now, upcoming=False, limit=limit, cursor=past_before),
     )
-
-    past_shows = list()
-    upcoming_shows = list()
-    for show in all_shows:
-        data_show = {
-            "artist_id": show.artist_id,
-            "artist_name": show.name,
-            "artist_image_link": show.image_link,
-            "start_time": str(show.start_time)
-        }
-        if show.start_time > datetime.now():
-            upcoming_shows.append(data_show)
-        else:
-            past_shows.append(data_show)
     data = {
         "id": venues.id,
         "name": venues.name,
@@ -175,9 +267,18 @@ def show_venue(venue_id):
         "image_link": venues.image_link,
         "past_shows": past_shows,
         "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "upcoming_shows_count": len(upcoming_shows),
-    }  
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_cursor": past_cursor,
+        "upcoming_shows_cursor": upcoming_cursor,
+    }
+    return data
+
+@app.route('/venues/<int:venue_id>')
+@query_budget(4)
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    data = cached_detail(venue_key(venue_id), lambda: venue_detail(venue_id))
     return render_template('pages/show_venue.html', venue=data)
 
 # Updata Venue by ID
@@ -221,6 +322,7 @@ def edit_venue_submission(venue_id):
         venue.seeking_talent= True  if 'seeking_talent' in request.form else False
         venue.seeking_description=request.form['seeking_description']
         db.session.commit()
+        invalidate_venue(detail_cache, venue_id)
     except: 
         db.session.rollback()
         flash('An error occurred. Venue could not be updated.')
@@ -236,13 +338,20 @@ def edit_venue_submission(venue_id):
 def delete_venue(venue_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
     # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+    # The venue's shows are deleted with it (cascade on Venue.shows), and the
+    # counters of the artists they were with are refreshed in the same commit.
+    venue = Venue.query.filter(Venue.id == venue_id).first_or_404()
+    venue_id, artist_ids = venue.id, [show.artist_id for show in venue.shows]
     try:
-        venue = Venue.query.filter(Venue.id == venue_id).first_or_404()
         db.session.delete(venue)
+        db.session.flush()
+        counters.refresh(Artist, artist_ids)
         db.session.commit()
-    except:
+        invalidate_venue(detail_cache, venue_id, artist_ids)
+    except SQLAlchemyError:
         db.session.rollback()
-        flash('An error occurred. Venue ')
+        flash('An error occurred. Venue could not be deleted.')
+        abort(500)
     finally:
         db.session.close()
     return render_template("pages/venues.html")
@@ -254,27 +363,43 @@ def delete_venue(venue_id):
 #  GET All Artist
 
 @app.route('/artists')
+@query_budget(1)
+@cached_page(page_cache)
 def artists():
-    # TODO: replace with real data returned from querying the database
+    # ?sort=activity lists artists with the most upcoming shows first and
+    # ?active=1 keeps only artists with upcoming shows; both read the
+    # precomputed counters.
+    query = db.session.query(
+        Artist.id, Artist.name, Artist.upcoming_shows_count, Artist.next_show_at
+    )
+    if request.args.get('active'):
+        query = query.filter(Artist.upcoming_shows_count > 0)
+    if request.args.get('sort') == 'activity':
+        query = query.order_by(
+            Artist.upcoming_shows_count.desc(), Artist.next_show_at, Artist.name
+        )
+    else:
+        query = query.order_by(Artist.name)
     data = list()
-    artists = db.session.query(Artist).all()
-    for artist in artists:
+    for artist in query:
         data.append({
             "id": artist.id,
-            "name": artist.name
+            "name": artist.name,
+            "num_upcoming_shows": artist.upcoming_shows_count,
+            "next_show_at": artist.next_show_at,
         })
     return render_template('pages/artists.html', artists=data)
 
 # Search for Artist
 
 @app.route('/artists/search', methods=['POST'])
+@query_budget(1)
 def search_artists():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
     # search for "band" should return "The Wild Sax Band".
     search_term = request.form.get("search_term", "")
-    result_of_search = Artist.query.filter(Artist.name.ilike(f"%{search_term}%"))
-    response = {"count": result_of_search.count(), "data": result_of_search}
+    response = search_names(Artist, search_term, app.config['SEARCH_RESULTS_LIMIT'])
     return render_template(
         "pages/search_artists.html", results=response, search_term=search_term
     )
@@ -322,37 +447,18 @@ def create_artist_submission():
 
 # GET A Artist by id  
 
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    # shows the venue page with the given artist_id
-    # TODO: replace with real venue data from the venues table, using artist_id
-    artist = Artist.query.filter(Artist.id == artist_id).first_or_404()
-    all_shows = (
-        db.session.query(
-            Venue.id.label("venue_id"),
-            Artist.id.label("artist_id"),
-            Artist.name,
-            Artist.image_link,
-            Show.start_time,
-        )
-        .join(Artist, Show.artist_id == Artist.id)
-        .join(Venue, Venue.id == Show.venue_id)
-        .filter(Artist.id == artist_id)
-        .all()
+def artist_detail(artist_id):
+    now = datetime.now()
+    limit = app.config['DETAIL_SHOWS_PER_PAGE']
+    upcoming_after = page_cursor('upcoming_after')
+    past_before = page_cursor('past_before')
+    # The four queries are independent, so they may run side by side.
+    artist, (upcoming_count, past_count), (upcoming_shows, upcoming_cursor), (past_shows, past_cursor) = run_parallel(
+        lambda: Artist.query.filter(Artist.id == artist_id).first_or_404(),
+        lambda: show_counts(Show.artist_id, artist_id, now),
+        lambda: artist_shows(artist_id, now, upcoming=True, limit=limit, cursor=upcoming_after),
+        lambda: artist_shows(artist_id, now, upcoming=False, limit=limit, cursor=past_before),
     )
-    past_shows = list()
-    upcoming_shows = list()
-    for show in all_shows:
-        data_show = {
-            "artist_id": show.artist_id,
-            "artist_name": show.name,
-            "artist_image_link": show.image_link,
-            "start_time": str(show.start_time),
-        }
-        if show.start_time > datetime.now():
-            upcoming_shows.append(data_show)
-        else:
-            past_shows.append(data_show)
     data = {
         "id": artist.id,
         "name": artist.name,
@@ -367,9 +473,18 @@ def show_artist(artist_id):
         "image_link": artist.image_link,
         "past_shows": past_shows,
         "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "upcoming_shows_count": len(upcoming_shows),
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_cursor": past_cursor,
+        "upcoming_shows_cursor": upcoming_cursor,
     }
+    return data
+
+@app.route('/artists/<int:artist_id>')
+@query_budget(4)
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    data = cached_detail(artist_key(artist_id), lambda: artist_detail(artist_id))
     return render_template('pages/show_artist.html', artist=data)
 
 # Updata Artist by ID 
@@ -412,6 +527,7 @@ def edit_artist_submission(artist_id):
         artist.seeking_venue = True if 'seeking_talent' in request.form else False
         artist.seeking_description = request.form['seeking_description']
         db.session.commit()
+        invalidate_artist(detail_cache, artist_id)
     except: 
         db.session.rollback()
         flash('An error occurred. Artist could not be updated.')
@@ -427,13 +543,20 @@ def edit_artist_submission(artist_id):
 def delete_artist(artist_id):
     # TODO: Complete this endpoint for taking a artist_id, and using
     # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+    # The artist's shows are deleted with it (cascade on Artist.shows), and the
+    # counters of the venues they were with are refreshed in the same commit.
+    artist = Artist.query.filter(Artist.id == artist_id).first_or_404()
+    artist_id, venue_ids = artist.id, [show.venue_id for show in artist.shows]
     try:
-        artist = Artist.query.filter(Artist.id == artist_id).first_or_404()
         db.session.delete(artist)
+        db.session.flush()
+        counters.refresh(Venue, venue_ids)
         db.session.commit()
-    except:
+        invalidate_artist(detail_cache, artist_id, venue_ids)
+    except SQLAlchemyError:
         db.session.rollback()
-        flash('An error occurred. Artist ')
+        flash('An error occurred. Artist could not be deleted.')
+        abort(500)
     finally:
         db.session.close()
     return render_template("pages/artists.html")
@@ -442,25 +565,29 @@ def delete_artist(artist_id):
 #  GET All Shows
 
 @app.route('/shows')
+@query_budget(1)
+@cached_page(page_cache)
 def shows():
-    # displays list of shows at /shows
-    # TODO: replace with real venues data.
-    #       num_shows should be aggregated based on number of upcoming shows per venue.
-    data = list()
-    shows = db.session.query(Show).all()
-    for show in shows:
-        venue = Venue.query.filter_by(id=show.venue_id).first_or_404()
-        artist = Artist.query.filter_by(id=show.artist_id).first_or_404()
-        data.extend([{
-            "venue_id": venue.id,
-            "venue_name": venue.name,
-            "artist_id": artist.id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": str(show.start_time)
-        }])
-
-    return render_template('pages/shows.html', shows=data)
+    # displays list of shows at /shows, one page at a time ordered by start_time;
+    # with from/to/city/state/genre it lists the shows in that range by day
+    filters = {name: request.args.get(name) for name in ('from', 'to', 'city', 'state', 'genre')
+               if request.args.get(name)}
+    if filters:
+        start, end = date_range()
+        days, next_cursor = shows_between(
+            start, end,
+            city=request.args.get('city'),
+            state=request.args.get('state'),
+            genre=request.args.get('genre'),
+            after=page_cursor(),
+            limit=page_size('SHOWS_PER_PAGE', 'SHOWS_MAX_PER_PAGE'),
+        )
+        return render_template('pages/shows.html', days=days, next_cursor=next_cursor, filters=filters)
+    data, next_cursor = show_feed(
+        after=page_cursor(),
+        limit=page_size('SHOWS_PER_PAGE', 'SHOWS_MAX_PER_PAGE'),
+    )
+    return render_template('pages/shows.html', shows=data, next_cursor=next_cursor)
 
 @app.route('/shows/create')
 def create_shows():
@@ -478,10 +605,13 @@ def create_show_submission():
         new_show = Show(
             artist_id=request.form['artist_id'],
             venue_id=request.form['venue_id'],
-            start_time=request.form['start_time'],
+            start_time=form.start_time.data,
         )
         db.session.add(new_show)
+        db.session.flush()
+        counters.refresh_show(new_show.venue_id, new_show.artist_id)
         db.session.commit()
+        invalidate_show(detail_cache, request.form['venue_id'], request.form['artist_id'])
         # on successful db insert, flash success
         flash('Show was successfully listed!')
     # TODO: on unsuccessful db insert, flash an error instead.
@@ -494,6 +624,143 @@ def create_show_submission():
         db.session.close()
     return render_template('pages/home.html')
 
+@app.route('/shows/schedule', methods=['POST'])
+def schedule_shows():
+    # Batch counterpart of create_show_submission for booking whole tours:
+    # takes {"shows": [{"artist_id", "venue_id", "start_time",
+    # "duration_minutes"}, ...]}, books every entry that does not overlap an
+    # existing show of its venue or artist, and reports the rest per entry.
+    payload = request.get_json(silent=True)
+    entries = payload.get('shows') if isinstance(payload, dict) else payload
+    if not isinstance(entries, list) or not entries:
+        return jsonify(error='expected a JSON list of shows'), 400
+    if len(entries) > app.config['SCHEDULE_MAX_ENTRIES']:
+        return jsonify(error=f"at most {app.config['SCHEDULE_MAX_ENTRIES']} shows per request"), 400
+    try:
+        results = scheduling.schedule(
+            entries,
+            default_duration=app.config['SHOW_DEFAULT_DURATION_MINUTES'],
+            max_duration=app.config['SHOW_MAX_DURATION_MINUTES'],
+        )
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.close()
+    scheduled = [result for result in results if result['status'] == 'scheduled']
+    for result in scheduled:
+        invalidate_show(detail_cache, result['venue_id'], result['artist_id'])
+    for result in results:
+        for conflict in result.get('conflicts', ()):
+            conflict.update((key, exporter.plain(value)) for key, value in conflict.items())
+    # 409 only when a real double-booking stopped the whole batch; a batch of
+    # nothing but invalid entries is a bad request.
+    if len(scheduled) == len(results):
+        status = 201
+    elif scheduled:
+        status = 200
+    elif any(result['status'] == 'conflict' for result in results):
+        status = 409
+    else:
+        status = 400
+    return jsonify(
+        scheduled=len(scheduled),
+        rejected=len(results) - len(scheduled),
+        results=results,
+    ), status
+
+#----------Export---------- #
+
+@app.route('/export/<any(venues, artists, shows):kind>.<any(csv, jsonl, ndjson):fmt>')
+def export(kind, fmt):
+    response = Response(
+        stream_with_context(exporter.generate(kind, fmt, app.config['EXPORT_CHUNK_SIZE'])),
+        mimetype=exporter.FORMATS[fmt],
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{fmt}'
+    return response
+
+#----------Commands---------- #
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(importer.SPECS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Input format; guessed from the file extension by default.')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--errors', 'errors_path',
+              help='Where to write rejected rows (default: PATH.errors.jsonl).')
+def import_command(kind, path, fmt, batch_size, errors_path):
+    """Bulk load venues, artists or shows from a CSV or JSON lines file."""
+    fmt = fmt or importer.detect_format(path)
+    errors_path = errors_path or f'{path}.errors.jsonl'
+    with open(errors_path, 'w', encoding='utf-8') as errors_file:
+        def on_error(line, row, errors):
+            errors_file.write(json.dumps({"line": line, "row": row, "errors": errors}) + '\n')
+
+        def on_progress(stats):
+            click.echo(f"{kind}: {stats['read']} read, {stats['inserted']} inserted, "
+                       f"{stats['rejected']} rejected")
+
+        stats = importer.import_rows(
+            kind, importer.read_rows(path, fmt), batch_size=batch_size,
+            on_error=on_error, on_progress=on_progress,
+        )
+    # Rows went in through Core inserts, so refresh everything derived from them.
+    page_cache.bump_version()
+    detail_cache.clear()
+    search.reset()
+    matchmaking.reset()
+    click.echo(f"Done: {stats['inserted']} of {stats['read']} rows imported.")
+    if stats['rejected']:
+        click.echo(f"{stats['rejected']} rejected rows written to {errors_path}")
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('--format', 'fmt', type=click.Choice(sorted(exporter.FORMATS)),
+              default='jsonl', show_default=True)
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+              help='File to write (default: stdout).')
+def export_command(kind, fmt, output):
+    """Stream every venue, artist or show to CSV or JSON lines."""
+    for chunk in exporter.generate(kind, fmt, app.config['EXPORT_CHUNK_SIZE']):
+        output.write(chunk)
+
+@app.cli.command('refresh-show-counters')
+@click.option('--all', 'everything', is_flag=True,
+              help='Recompute every venue and artist, not just those with a show that started.')
+def refresh_show_counters_command(everything):
+    """Move started shows from upcoming to past in the venue and artist counters.
+
+    Run it periodically, e.g. from cron every few minutes.
+    """
+    changed = counters.refresh_all() if everything else counters.refresh_due()
+    db.session.commit()
+    if changed:
+        page_cache.bump_version()
+        detail_cache.clear()
+    click.echo(f'{changed} venue and artist rows refreshed.')
+
+#----------Monitoring---------- #
+
+@app.route('/stats/cache')
+def cache_stats():
+    return jsonify(
+        details=detail_cache.stats(),
+        pages=page_cache.stats(),
+        fragments=fragment_cache.stats(),
+    )
+
+@app.route('/stats/pool')
+def pool_stats():
+    return jsonify(dict(dbpool.metrics.stats(), routing=db.router.stats()))
+
+@app.route('/metrics')
+def prometheus():
+    # Prometheus text format, summed over all workers when METRICS_DIR is set.
+    return prometheus_metrics()
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -513,6 +780,11 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+    slow_handler = FileHandler(app.config['SLOW_QUERY_LOG'])
+    slow_handler.setFormatter(sqlstats.JsonFormatter())
+    sqlstats.slow_log.setLevel(logging.WARNING)
+    sqlstats.slow_log.addHandler(slow_handler)
+
 #----------Launch---------- #
 
 # Default port:
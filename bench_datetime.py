@@ -0,0 +1,80 @@
+#----------Imports---------- #
+# Microbenchmark for the datetime filter on show tiles.
+#
+#   python bench_datetime.py --shows 200 --distinct 50 --repeat 20
+#
+# "before" is the old path: views passed str(start_time) and the filter
+# re-parsed it with dateutil and formatted it with babel.dates. "cold" is the
+# new filter with an empty memo (first request after a deploy) and "warm" is
+# the steady state, where listings repeat start times already formatted.
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+import babel.dates
+import dateutil.parser
+from jinja2 import Environment
+from app import format_datetime, formatted_datetime
+
+
+def old_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def start_times(shows, distinct):
+    now = datetime.now().replace(second=0, microsecond=0)
+    pool = [now + timedelta(hours=random.randrange(24 * 365)) for _ in range(distinct)]
+    return [random.choice(pool) for _ in range(shows)]
+
+
+def per_show(render, times, repeat, before_each=None):
+    # Best of `repeat` runs, in microseconds per show tile.
+    best = float('inf')
+    for _ in range(repeat):
+        if before_each is not None:
+            before_each()
+        started = time.perf_counter()
+        render(times)
+        best = min(best, time.perf_counter() - started)
+    return best / len(times) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the old and new datetime filters.')
+    parser.add_argument('--shows', type=int, default=200)
+    parser.add_argument('--distinct', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    times = start_times(args.shows, args.distinct)
+    tile = "{% for time in times %}<h4>{{ time|datetime('full') }}</h4>{% endfor %}"
+    old_env, new_env = Environment(), Environment()
+    old_env.filters['datetime'] = old_format_datetime
+    new_env.filters['datetime'] = format_datetime
+    old_template = old_env.from_string(tile)
+    new_template = new_env.from_string(tile)
+
+    assert [old_format_datetime(str(value), 'full') for value in times] == \
+        [format_datetime(value, 'full') for value in times]
+
+    results = [
+        ('before', per_show(
+            lambda values: old_template.render(times=[str(value) for value in values]),
+            times, args.repeat)),
+        ('cold', per_show(
+            lambda values: new_template.render(times=values),
+            times, args.repeat, before_each=formatted_datetime.cache_clear)),
+        ('warm', per_show(
+            lambda values: new_template.render(times=values),
+            times, args.repeat)),
+    ]
+    print(f'{"filter":<10}{"us/show":>10}{"speedup":>10}')
+    for name, cost in results:
+        print(f'{name:<10}{cost:>10.2f}{results[0][1] / cost:>9.1f}x')
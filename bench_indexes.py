@@ -0,0 +1,149 @@
+#----------Imports---------- #
+# Compares query plans and timings for the hot lookups with and without the
+# indexes declared in models.py.
+#
+#   python seed.py --database-url sqlite:///bench.db --create --scale 1000
+#   python bench_indexes.py --database-url sqlite:///bench.db --shows 200000 --runs 20
+#
+# It adds synthetic rows and drops and recreates indexes, so it needs an
+# explicit --database-url and refuses the app's own database unless
+# --allow-app-database is given.
+
+import argparse
+import importlib
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import inspect
+from sqlalchemy.engine.url import make_url
+from models import db, Venue, Artist, Show
+from seed import seed
+
+
+INDEXES = [
+    index for table in (Show.__table__, Venue.__table__) for index in table.indexes
+    if index.name in ('ix_Show_venue_id_start_time', 'ix_Show_artist_id_start_time',
+                      'ix_Show_start_time_id', 'ix_Venue_state_city')
+]
+
+
+#----------Queries---------- #
+
+def hot_queries(venue_id, artist_id, now):
+    return {
+        "venue upcoming shows": (
+            db.session.query(Show.id, Show.start_time)
+            .filter(Show.venue_id == venue_id)
+            .filter(Show.start_time > now)
+        ),
+        "artist upcoming shows": (
+            db.session.query(Show.id, Show.start_time)
+            .filter(Show.artist_id == artist_id)
+            .filter(Show.start_time > now)
+        ),
+        "shows this week": (
+            db.session.query(Show.id, Show.start_time)
+            .filter(Show.start_time >= now, Show.start_time < now + timedelta(days=7))
+            .order_by(Show.start_time, Show.id)
+            .limit(50)
+        ),
+        "venue areas": (
+            db.session.query(Venue.city, Venue.state)
+            .group_by(Venue.state, Venue.city)
+        ),
+    }
+
+
+def explain(connection, query):
+    compiled = query.statement.compile(dialect=connection.dialect)
+    params = compiled.params
+    if connection.dialect.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if connection.dialect.name == 'postgresql':
+        prefix = 'EXPLAIN ANALYZE '
+    else:
+        prefix = 'EXPLAIN QUERY PLAN '
+    return [' '.join(str(col) for col in row) for row in
+            connection.execute(prefix + str(compiled), params)]
+
+
+def timed(query, runs):
+    timings = list()
+    for _ in range(runs):
+        started = time.perf_counter()
+        query.all()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+#----------Indexes---------- #
+
+def set_indexes(enabled):
+    engine = db.engine
+    existing = set()
+    for table in ('Show', 'Venue'):
+        existing.update(index['name'] for index in inspect(engine).get_indexes(table))
+    for index in INDEXES:
+        if enabled and index.name not in existing:
+            index.create(bind=engine)
+        elif not enabled and index.name in existing:
+            index.drop(bind=engine)
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            connection.execute('ANALYZE')
+    else:
+        engine.execute('ANALYZE')
+
+
+def run(runs):
+    venue_id = db.session.query(Show.venue_id).limit(1).scalar()
+    artist_id = db.session.query(Show.artist_id).limit(1).scalar()
+    now = datetime.now()
+    results = dict()
+    db.session.commit()
+    for enabled in (False, True):
+        set_indexes(enabled)
+        label = 'with indexes' if enabled else 'without indexes'
+        for name, query in hot_queries(venue_id, artist_id, now).items():
+            connection = db.session.connection()
+            plan = explain(connection, query)
+            results.setdefault(name, dict())[label] = timed(query, runs)
+            print(f'--- {name} ({label})')
+            for line in plan:
+                print(f'    {line}')
+        db.session.commit()
+
+    print()
+    print(f'{"query":<24}{"without (ms)":>14}{"with (ms)":>12}')
+    for name, timing in results.items():
+        print(f'{name:<24}{timing["without indexes"]:>14.2f}{timing["with indexes"]:>12.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare hot query plans with and without indexes.')
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--no-seed', action='store_true',
+                        help='benchmark the existing data instead of adding rows')
+    parser.add_argument('--database-url', required=True,
+                        help='a scratch database with the schema, e.g. sqlite:///bench.db')
+    parser.add_argument('--allow-app-database', action='store_true',
+                        help='allow the database the app is configured with (DATABASE_URL)')
+    args = parser.parse_args()
+
+    import config  # the database the app would use without --database-url
+    if make_url(args.database_url) == make_url(config.SQLALCHEMY_DATABASE_URI) \
+            and not args.allow_app_database:
+        parser.error('--database-url is the app\'s own database; this benchmark adds rows '
+                     'and drops indexes there. Pass --allow-app-database to do it anyway.')
+    os.environ['DATABASE_URL'] = args.database_url
+    importlib.reload(config)
+    from app import app
+
+    with app.app_context():
+        if not args.no_seed:
+            seed(venues=args.venues, artists=args.artists, shows=args.shows)
+        run(args.runs)
@@ -0,0 +1,80 @@
+#----------Imports---------- #
+# Load test for the detail pages with PARALLEL_QUERIES off and on.
+#
+#   python bench_parallel.py --clients 8 --requests 400 --latency-ms 2
+#
+# --latency-ms adds a sleep before every statement to stand in for the
+# network round trip to a remote database, which is what parallel queries
+# hide; against a local database the difference is small.
+
+import argparse
+import random
+import threading
+import time
+from sqlalchemy import event
+from app import app, detail_cache
+from models import db, Venue, Artist
+
+
+def add_latency(seconds):
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def sleep(*args):
+        time.sleep(seconds)
+
+
+def load(urls, clients, requests):
+    timings = list()
+    lock = threading.Lock()
+
+    def worker(count):
+        client = app.test_client()
+        for _ in range(count):
+            url = random.choice(urls)
+            started = time.perf_counter()
+            client.get(url)
+            elapsed = time.perf_counter() - started
+            with lock:
+                timings.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(requests // clients,)) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "rps": len(timings) / wall,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95)] * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare serial and parallel detail page queries.')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    with app.app_context():
+        venue_ids = [row.id for row in db.session.query(Venue.id).limit(200)]
+        artist_ids = [row.id for row in db.session.query(Artist.id).limit(200)]
+        if args.latency_ms:
+            add_latency(args.latency_ms / 1000)
+    urls = [f'/venues/{venue_id}' for venue_id in venue_ids] + \
+        [f'/artists/{artist_id}' for artist_id in artist_ids]
+    if not urls:
+        raise SystemExit('No venues or artists found; run seed.py first.')
+
+    # Measure the queries, not the detail cache.
+    detail_cache.set = lambda key, value: None
+    print(f'{"mode":<10}{"requests":>10}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}')
+    for parallel in (False, True):
+        app.config['PARALLEL_QUERIES'] = parallel
+        result = load(urls, args.clients, args.requests)
+        mode = 'parallel' if parallel else 'serial'
+        print(f'{mode:<10}{result["requests"]:>10}{result["rps"]:>10.1f}'
+              f'{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}')
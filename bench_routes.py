@@ -0,0 +1,261 @@
+#----------Imports---------- #
+# Drives every read-only route of the app through the Flask test client and
+# writes a JSON report of latency, query counts and memory per route, so runs
+# before and after a change can be compared.
+#
+#   python seed.py --database-url sqlite:///bench.db --create --scale 100000
+#   python bench_routes.py --database-url sqlite:///bench.db --report before.json
+#   ... change something ...
+#   python bench_routes.py --database-url sqlite:///bench.db --report after.json \
+#       --compare before.json
+#
+# Routes that write (create, edit, delete, schedule) are skipped. The exit
+# status is 1 when any route answers with a server error, so the run doubles
+# as a smoke test.
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from werkzeug.routing import AnyConverter
+
+
+#----------Routes---------- #
+
+WRITES = re.compile(r'/(create|edit|delete|schedule)$')
+
+SEARCHES = {
+    "/venues/search": 'the',
+    "/artists/search": 'band',
+}
+
+
+def sample_ids(db, Venue, Artist, count):
+    venue_ids = [row.id for row in db.session.query(Venue.id).order_by(Venue.id).limit(count)]
+    artist_ids = [row.id for row in db.session.query(Artist.id).order_by(Artist.id).limit(count)]
+    return venue_ids, artist_ids
+
+
+def requests_for(app, venue_ids, artist_ids, rng):
+    # One (name, method, url builder, data) per benchmarked request. URL
+    # builders pick a random record each time so caches see a realistic mix.
+    today = date.today()
+    variants = {
+        "shows": [
+            ('range', f'from={today}&to={today + timedelta(days=7)}'),
+            ('city', f'from={today}&city=San Francisco'),
+            ('genre', f'from={today}&genre=Jazz'),
+        ],
+        "artists": [('activity', 'sort=activity&active=1')],
+        "api.browse_resource": [('genre', 'genre=Jazz&seeking=true')],
+    }
+    plans = list()
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint == 'static' or WRITES.search(rule.rule):
+            continue
+        if 'GET' in rule.methods:
+            for builder in builders(rule, venue_ids, artist_ids, rng):
+                plans.append((f'GET {builder[0]}', 'GET', builder[1], None))
+                for suffix, query in variants.get(rule.endpoint, ()):
+                    plans.append((f'GET {builder[0]}?{suffix}', 'GET',
+                                  lambda build=builder[1], query=query: f'{build()}?{query}', None))
+        if 'POST' in rule.methods and rule.rule in SEARCHES:
+            plans.append((f'POST {rule.rule}', 'POST', lambda url=rule.rule: url,
+                          {"search_term": SEARCHES[rule.rule]}))
+    return plans
+
+
+def any_options(converter):
+    # werkzeug's AnyConverter keeps its choices only as a regex, (?:a|b).
+    if not isinstance(converter, AnyConverter):
+        return None
+    return [re.sub(r'\\(.)', r'\1', option) for option in converter.regex[3:-1].split('|')]
+
+
+def builders(rule, venue_ids, artist_ids, rng):
+    # Expands a rule into one (label, url builder) pair per combination of
+    # any() choices; ids are drawn at request time.
+    choices = [dict()]
+    for name in rule.arguments:
+        options = any_options(rule._converters[name])
+        if options:
+            choices = [dict(choice, **{name: option}) for choice in choices for option in options]
+    result = list()
+    for choice in choices:
+        def build(choice=choice):
+            values = dict(choice)
+            resource = values.get('resource') or values.get('kind')
+            for name in rule.arguments:
+                if name not in values:
+                    artist = 'artist' in name or resource == 'artists'
+                    ids = artist_ids if artist else venue_ids
+                    values[name] = rng.choice(ids)
+            return rule.build(values, append_unknown=False)[1]
+        label = re.sub(r'<(?:[^:<>]+:)?([^<>]+)>',
+                       lambda match: choice.get(match.group(1), f'<{match.group(1)}>'), rule.rule)
+        result.append((label, build))
+    return result
+
+
+#----------Measuring---------- #
+
+class QueryCounter:
+    # Counts statements on every engine, including the ones detail pages run
+    # on the parallel query threads; requests are sent one at a time.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def counted(*args):
+            with self.lock:
+                self.count += 1
+
+    def take(self):
+        with self.lock:
+            count, self.count = self.count, 0
+        return count
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(client, plan, repeat, counter, cold):
+    name, method, build, data = plan
+    timings, queries, statuses = list(), list(), dict()
+    tracemalloc.start()
+    for _ in range(repeat):
+        if cold is not None:
+            cold()
+        url = build()
+        counter.take()
+        started = time.perf_counter()
+        if method == 'GET':
+            response = client.get(url)
+        else:
+            response = client.post(url, data=data)
+        response.get_data()
+        timings.append(time.perf_counter() - started)
+        queries.append(counter.take())
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "requests": repeat,
+        "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "queries_median": percentile(queries, 0.5),
+        "queries_max": max(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+#----------Report---------- #
+
+def compare(report, baseline):
+    print(f'{"route":<48}{"p50 ms":>16}{"p95 ms":>16}{"queries":>12}{"peak KB":>18}')
+    for name, now in report['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            print(f'{name:<48}{now["p50_ms"]:>16.2f}{now["p95_ms"]:>16.2f}'
+                  f'{now["queries_median"]:>12}{now["peak_memory_kb"]:>18.1f}  (new)')
+            continue
+
+        def change(key):
+            if not before[key]:
+                return f'{now[key]}'
+            return f'{now[key]} ({(now[key] - before[key]) / before[key]:+.0%})'
+
+        print(f'{name:<48}{change("p50_ms"):>16}{change("p95_ms"):>16}'
+              f'{change("queries_median"):>12}{change("peak_memory_kb"):>18}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark every read-only route.')
+    parser.add_argument('--database-url', help='defaults to DATABASE_URL')
+    parser.add_argument('--requests', type=int, default=20, help='requests per route')
+    parser.add_argument('--sample', type=int, default=200,
+                        help='venues and artists to draw detail pages from')
+    parser.add_argument('--cold', action='store_true',
+                        help='clear the page, detail and fragment caches before every request')
+    parser.add_argument('--only', help='regular expression; benchmark matching routes only')
+    parser.add_argument('--skip', help='regular expression; skip matching routes (e.g. export)')
+    parser.add_argument('--report', default='bench_report.json')
+    parser.add_argument('--compare', help='an earlier report to compare against')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    from app import app, detail_cache, page_cache, fragment_cache
+    from models import db, Venue, Artist, Show
+
+    rng = random.Random(args.seed)
+    counter = QueryCounter()
+    counter.install()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    def clear_caches():
+        page_cache.bump_version()
+        detail_cache.clear()
+        fragment_cache.clear()
+
+    with app.app_context():
+        venue_ids, artist_ids = sample_ids(db, Venue, Artist, args.sample)
+        rows = {model.__tablename__: db.session.query(model).count() for model in (Venue, Artist, Show)}
+        backend = db.engine.dialect.name
+    if not venue_ids or not artist_ids:
+        raise SystemExit('No venues or artists found; run seed.py first.')
+
+    plans = requests_for(app, venue_ids, artist_ids, rng)
+    if args.only:
+        plans = [plan for plan in plans if re.search(args.only, plan[0])]
+    if args.skip:
+        plans = [plan for plan in plans if not re.search(args.skip, plan[0])]
+
+    client = app.test_client()
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec='seconds'),
+            "database": backend,
+            "rows": rows,
+            "requests_per_route": args.requests,
+            "cold_caches": args.cold,
+            "python": platform.python_version(),
+        },
+        "routes": dict(),
+    }
+    failed = list()
+    for plan in plans:
+        result = measure(client, plan, args.requests, counter, clear_caches if args.cold else None)
+        report['routes'][plan[0]] = result
+        if any(status.startswith('5') for status in result['statuses']):
+            failed.append(plan[0])
+        print(f'{plan[0]:<48}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+              f'{result["queries_median"]:>6}{result["peak_memory_kb"]:>12.1f} KB  {result["statuses"]}')
+
+    with open(args.report, 'w') as handle:
+        json.dump(report, handle, indent=2)
+    print(f'Report written to {args.report}')
+    if args.compare:
+        with open(args.compare) as handle:
+            compare(report, json.load(handle))
+    if failed:
+        print(f'Server errors on: {", ".join(failed)}', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,337 @@
+#----------Imports---------- #
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from functools import wraps
+from flask import current_app, make_response, request, session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import db, Venue, Artist, Show
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+#----------Backends---------- #
+# Both backends count hits and misses in-process so each worker can report
+# its own ratio. They also hold the catalog data version used to key cached
+# pages. The Redis one is shared by every worker on every host; the memory
+# backend keeps it in a VersionFile shared by every process on the host
+# (gunicorn workers and CLI commands alike).
+
+class VersionFile:
+    # The version is the file's modification time in nanoseconds, so reading
+    # it is one stat() and a bump is one utime().
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        open(path, 'a').close()
+
+    def version(self):
+        try:
+            modified = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return 0, datetime(1970, 1, 1)
+        return modified, datetime.utcfromtimestamp(modified // 10 ** 9)
+
+    def bump(self):
+        try:
+            previous = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            open(self.path, 'a').close()
+            previous = 0
+        # Never reuse a version, even if the clock has not moved on.
+        modified = max(time.time_ns(), previous + 1000)
+        os.utime(self.path, ns=(modified, modified))
+        return previous, modified
+
+
+class LRUCache:
+    shared = False
+
+    def __init__(self, max_entries=1024, ttl=60, version_file=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.version_file = version_file
+        self.data_version = (0, datetime.utcnow().replace(microsecond=0))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def version(self):
+        if self.version_file is not None:
+            return self.version_file.version()
+        return self.data_version
+
+    def bump_version(self):
+        # Returns the (previous, new) version numbers.
+        if self.version_file is not None:
+            return self.version_file.bump()
+        with self.lock:
+            previous = self.data_version[0]
+            self.data_version = (previous + 1, datetime.utcnow().replace(microsecond=0))
+        return previous, previous + 1
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+        }
+
+
+class RedisCache:
+    shared = True
+
+    def __init__(self, url, ttl=60, prefix='fyyur:'):
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND = "redis" requires the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def version(self):
+        version, modified = self.client.hmget(self.prefix + 'data-version', 'version', 'modified')
+        if version is None:
+            return 0, datetime(1970, 1, 1)
+        return int(version), datetime.utcfromtimestamp(int(modified))
+
+    def bump_version(self):
+        key = self.prefix + 'data-version'
+        pipe = self.client.pipeline()
+        pipe.hincrby(key, 'version', 1)
+        pipe.hset(key, 'modified', int(time.time()))
+        version = pipe.execute()[0]
+        return version - 1, version
+
+    def stats(self):
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def make_cache(config):
+    if config.get('CACHE_BACKEND', 'memory') == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'], ttl=config['CACHE_TTL'])
+    version_file = config.get('CACHE_VERSION_FILE')
+    return LRUCache(
+        max_entries=config['CACHE_MAX_ENTRIES'],
+        ttl=config['CACHE_TTL'],
+        version_file=VersionFile(version_file) if version_file else None,
+    )
+
+
+#----------Detail Pages---------- #
+# Venue pages list the artists that played there and artist pages list the
+# venues, so a write to one record also drops the pages of its counterparts.
+# Call these after the commit, or a concurrent read can cache the old row
+# again; a delete passes the counterpart ids it collected beforehand. Deletes
+# only reach a shared (Redis) cache; per-process memory caches key detail
+# pages by the catalog data version instead (detail_key), so a write in any
+# process retires them.
+
+def venue_key(venue_id):
+    return f'venue:{venue_id}'
+
+
+def artist_key(artist_id):
+    return f'artist:{artist_id}'
+
+
+def detail_key(cache, key):
+    if cache.shared:
+        return key
+    return f'{key}@{cache.version()[0]}'
+
+
+def invalidate_venue(cache, venue_id, artist_ids=None):
+    if artist_ids is None:
+        rows = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+        artist_ids = [row.artist_id for row in rows]
+    cache.delete(venue_key(venue_id), *(artist_key(artist_id) for artist_id in set(artist_ids)))
+
+
+def invalidate_artist(cache, artist_id, venue_ids=None):
+    if venue_ids is None:
+        rows = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+        venue_ids = [row.venue_id for row in rows]
+    cache.delete(artist_key(artist_id), *(venue_key(venue_id) for venue_id in set(venue_ids)))
+
+
+def invalidate_show(cache, venue_id, artist_id):
+    cache.delete(venue_key(venue_id), artist_key(artist_id))
+
+
+#----------Catalog Writes---------- #
+# Every committed write to Venue, Artist or Show bumps the catalog data
+# version, which keys cached listing pages and tells each process's derived
+# state (search indexes, match rankings) that it may be stale. A process that
+# made the write also passes the rows it changed to the on_catalog_commit
+# listeners together with the (previous, new) version: a listener whose state
+# was built at `previous` can patch in just those rows and move on to `new`;
+# anything else rebuilds when it next sees the version. Writes that bypass the
+# ORM (Core inserts, CLI refreshes) call bump_version() themselves.
+
+# `values` holds the row's loaded column values after the flush (a deleted
+# row's last ones); `before` those it had before, or None for a new row. A
+# column changed without its old value in memory is missing from `before`.
+
+CatalogChange = namedtuple('CatalogChange', 'model id deleted values before')
+
+_catalog = {"cache": None, "listeners": list()}
+
+
+def on_catalog_commit(listener):
+    _catalog['listeners'].append(listener)
+    return listener
+
+
+def catalog_version():
+    cache = _catalog['cache']
+    return cache.version()[0] if cache is not None else None
+
+
+def loaded_values(obj):
+    # Column values already in memory; reading others would emit SQL.
+    state = inspect(obj)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs
+            if attr.key in state.dict}
+
+
+def values_before_flush(obj, values):
+    # Attribute history still holds the replaced values during after_flush.
+    state = inspect(obj)
+    before = dict(values)
+    for key in values:
+        history = state.attrs[key].history
+        if history.deleted:
+            before[key] = history.deleted[0]
+        elif history.added:
+            del before[key]
+    return before
+
+
+def track_catalog_writes(cache):
+    _catalog['cache'] = cache
+
+    @event.listens_for(Session, 'after_flush')
+    def flushed(db_session, flush_context):
+        changes = db_session.info.setdefault('catalog_changes', list())
+        for objects, new, deleted in ((db_session.new, True, False),
+                                      (db_session.dirty, False, False),
+                                      (db_session.deleted, False, True)):
+            for obj in objects:
+                if isinstance(obj, (Venue, Artist, Show)):
+                    values = loaded_values(obj)
+                    before = None if new else values_before_flush(obj, values)
+                    changes.append(CatalogChange(type(obj), obj.id, deleted, values, before))
+        if not changes:
+            db_session.info.pop('catalog_changes')
+
+    @event.listens_for(Session, 'after_commit')
+    def committed(db_session):
+        changes = db_session.info.pop('catalog_changes', None)
+        if changes:
+            previous, current = cache.bump_version()
+            for listener in _catalog['listeners']:
+                listener(changes, previous, current)
+
+    @event.listens_for(Session, 'after_rollback')
+    def rolled_back(db_session):
+        db_session.info.pop('catalog_changes', None)
+
+
+#----------Pages---------- #
+# Listing pages are cached whole, keyed by path and catalog data version, so
+# any committed write to Venue, Artist or Show retires every cached page.
+
+def cached_page(cache):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pages carrying flashed messages belong to one visitor.
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+            version, modified = cache.version()
+            key = f'page:{version}:{request.full_path}'
+            entry = cache.get(key)
+            if entry is None:
+                body = view(*args, **kwargs)
+                entry = {
+                    "body": body,
+                    "etag": hashlib.sha1(body.encode('utf-8')).hexdigest(),
+                    "last_modified": modified,
+                }
+                cache.set(key, entry)
+            response = make_response(entry['body'])
+            response.set_etag(entry['etag'])
+            response.last_modified = entry['last_modified']
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config['PAGE_CACHE_MAX_AGE']
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
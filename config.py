@@ -1,4 +1,5 @@
 import os
+import tempfile
 SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -12,5 +13,95 @@ DEBUG = True
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgres://awotefalharbi@localhost:5432/fyyur'
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgres://awotefalharbi@localhost:5432/fyyur')
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool, overridable per environment
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+DB_HOLD_WARNING_SECONDS = float(os.environ.get('DB_HOLD_WARNING_SECONDS', 2.0))
+
+# Read replicas for GET/HEAD requests, comma separated in DATABASE_REPLICA_URLS
+SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+REPLICA_READ_AFTER_WRITE_SECONDS = 10
+REPLICA_HEALTH_RETRY_SECONDS = 30
+
+# Pagination
+SHOWS_PER_PAGE = 50
+SHOWS_MAX_PER_PAGE = 200
+AREAS_PER_PAGE = 25
+AREAS_MAX_PER_PAGE = 100
+DETAIL_SHOWS_PER_PAGE = 12
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+# include=shows returns at most this many upcoming shows per venue or artist;
+# shows_total says how many there are in all.
+API_SHOWS_PER_PARENT = 10
+
+# Search
+SEARCH_RESULTS_LIMIT = 50
+
+# Detail page cache: 'memory' (per-process LRU) or 'redis'
+CACHE_BACKEND = 'memory'
+CACHE_REDIS_URL = 'redis://localhost:6379/0'
+CACHE_MAX_ENTRIES = 2048
+CACHE_TTL = 300
+# With the memory backend, a write in any process on this host retires cached
+# listing and detail pages through this file's timestamp. Workers on several
+# hosts need the redis backend.
+CACHE_VERSION_FILE = os.environ.get(
+    'CACHE_VERSION_FILE', os.path.join(tempfile.gettempdir(), 'fyyur-data-version'))
+
+# Listing pages: seconds browsers and proxies may reuse a response
+PAGE_CACHE_MAX_AGE = 60
+
+# Rows fetched per server-side cursor round trip when exporting
+EXPORT_CHUNK_SIZE = 1000
+
+# Run the independent queries of a detail page on a shared thread pool.
+# Each thread holds its own connection, so size the pool to match.
+PARALLEL_QUERIES = True
+QUERY_THREADS = 8
+
+# Compiled templates are cached on disk so new workers skip compiling them.
+# Set TEMPLATE_BYTECODE_CACHE_DIR to an empty string to turn this off.
+TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get(
+    'TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'fyyur-jinja'))
+
+# Rendered show and venue tiles ({% cache %} blocks) are reused across pages
+FRAGMENT_CACHE = True
+
+# Batch show scheduling (/shows/schedule)
+SHOW_DEFAULT_DURATION_MINUTES = 120
+SHOW_MAX_DURATION_MINUTES = 12 * 60
+SCHEDULE_MAX_ENTRIES = 500
+
+# Date range listings (/shows?from=&to=) and venue availability
+CALENDAR_DEFAULT_DAYS = 7
+CALENDAR_MAX_DAYS = 92
+
+# Venue/artist matchmaking (/api/v1/<venues|artists>/<id>/matches)
+MATCH_RESULTS = 10
+MATCH_CACHE_ENTRIES = 512
+MATCH_CACHE_TTL = 600
+
+# SQL instrumentation: Server-Timing headers, slow-query log and per-view
+# query budgets (@query_budget). Server-Timing names the slowest statements
+# only in debug mode or with SERVER_TIMING_SQL. With QUERY_BUDGET_ENFORCE a
+# view over its budget raises instead of logging, which fails tests.
+SERVER_TIMING = True
+SERVER_TIMING_SQL = os.environ.get('SERVER_TIMING_SQL', '') == '1'
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG = 'slow_queries.log'
+SLOWEST_STATEMENTS = 3
+QUERY_BUDGET_ENFORCE = os.environ.get('QUERY_BUDGET_ENFORCE', '') == '1'
+
+# Prometheus metrics (/metrics). Each worker keeps its own counters; with
+# METRICS_DIR set (e.g. under gunicorn) workers write snapshots there and
+# /metrics sums them. Empty the directory before starting the server.
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = 5
@@ -0,0 +1,58 @@
+#----------Imports---------- #
+
+from datetime import datetime
+from sqlalchemy import and_, func, select
+from models import db, Venue, Artist, Show
+
+
+#----------Show Counters---------- #
+# Venue and Artist carry upcoming_shows_count, past_shows_count and
+# next_show_at so listings can sort and filter by activity without
+# aggregating Show. Writers refresh the rows they touch inside their own
+# transaction; refresh_due() moves shows from upcoming to past as time
+# passes and is meant to run periodically (`flask refresh-show-counters`).
+
+def show_column(model):
+    return Show.venue_id if model is Venue else Show.artist_id
+
+
+def refresh(model, ids=None, now=None):
+    # Recomputes the counters of the given rows (all rows when ids is None)
+    # with one correlated UPDATE.
+    now = now or datetime.now()
+    column = show_column(model)
+    mine = column == model.id
+    upcoming = select([func.count(Show.id)]).where(and_(mine, Show.start_time > now))
+    past = select([func.count(Show.id)]).where(and_(mine, Show.start_time <= now))
+    next_show = select([func.min(Show.start_time)]).where(and_(mine, Show.start_time > now))
+    statement = model.__table__.update().values(
+        upcoming_shows_count=upcoming.as_scalar(),
+        past_shows_count=past.as_scalar(),
+        next_show_at=next_show.as_scalar(),
+    )
+    if ids is not None:
+        ids = {int(row_id) for row_id in ids}
+        if not ids:
+            return 0
+        statement = statement.where(model.id.in_(ids))
+    return db.session.execute(statement).rowcount
+
+
+def refresh_show(venue_id, artist_id, now=None):
+    refresh(Venue, [venue_id], now)
+    refresh(Artist, [artist_id], now)
+
+
+def refresh_due(now=None):
+    # Only rows whose next show has started can have stale counters.
+    now = now or datetime.now()
+    changed = 0
+    for model in (Venue, Artist):
+        due = [row.id for row in db.session.query(model.id).filter(model.next_show_at <= now)]
+        changed += refresh(model, due, now)
+    return changed
+
+
+def refresh_all(now=None):
+    now = now or datetime.now()
+    return refresh(Venue, now=now) + refresh(Artist, now=now)
@@ -0,0 +1,124 @@
+#----------Imports---------- #
+
+import threading
+import time
+import weakref
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import Pool, QueuePool
+
+
+#----------Metrics---------- #
+
+class PoolMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.long_holds = 0
+        self.pools = weakref.WeakSet()
+
+    def waited(self, seconds, timed_out=False):
+        with self.lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+
+    def stats(self):
+        # Gauges are summed over every live pool (primary and replicas).
+        pools = list(self.pools)
+        return {
+            "size": sum(pool.size() for pool in pools),
+            "checked_out": sum(pool.checkedout() for pool in pools),
+            "overflow": sum(pool.overflow() for pool in pools),
+            "checkouts": self.checkouts,
+            "wait_seconds_total": round(self.wait_seconds, 6),
+            "wait_seconds_max": round(self.max_wait_seconds, 6),
+            "timeouts": self.timeouts,
+            "long_holds": self.long_holds,
+        }
+
+
+metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited for a connection.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        metrics.pools.add(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            metrics.waited(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.waited(time.perf_counter() - started)
+        return connection
+
+
+#----------Engine Options---------- #
+
+def engine_options(url, config):
+    # Worked out per bind (primary and each replica) from that bind's URL.
+    # Pool settings only apply to pooled server databases; SQLite keeps the
+    # defaults Flask-SQLAlchemy picks for it.
+    url = make_url(url)
+    dialect = url.get_dialect().name
+    if dialect == 'sqlite':
+        return dict()
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": config['DB_POOL_SIZE'],
+        "max_overflow": config['DB_MAX_OVERFLOW'],
+        "pool_timeout": config['DB_POOL_TIMEOUT'],
+        "pool_recycle": config['DB_POOL_RECYCLE'],
+        "pool_pre_ping": config['DB_POOL_PRE_PING'],
+    }
+    # 'postgres://' URLs name the postgresql dialect too.
+    if dialect == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {
+            "options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}",
+        }
+    return options
+
+
+#----------Checkout Tracking---------- #
+
+def track_checkouts(app):
+    # Logs a warning when a connection goes back to the pool after being held
+    # longer than DB_HOLD_WARNING_SECONDS, naming the request that held it.
+
+    @event.listens_for(Pool, 'checkout')
+    def checkout(dbapi_connection, record, proxy):
+        record.info['checked_out_at'] = time.perf_counter()
+        record.info['checked_out_by'] = (
+            f'{request.method} {request.path}' if has_request_context() else None
+        )
+
+    @event.listens_for(Pool, 'checkin')
+    def checkin(dbapi_connection, record):
+        started = record.info.pop('checked_out_at', None)
+        holder = record.info.pop('checked_out_by', None)
+        if started is None:
+            return
+        held = time.perf_counter() - started
+        threshold = app.config['DB_HOLD_WARNING_SECONDS']
+        if held > threshold:
+            with metrics.lock:
+                metrics.long_holds += 1
+            app.logger.warning(
+                'Connection held for %.3fs (threshold %.3fs) by %s',
+                held, threshold, holder or 'a background task',
+            )
@@ -0,0 +1,90 @@
+#----------Imports---------- #
+
+import csv
+import io
+import json
+from datetime import datetime
+from models import db, Venue, Artist, Show
+
+
+#----------Queries---------- #
+# Rows are read through a server-side cursor (stream_results) in yield_per
+# chunks, so memory stays flat however large the table is.
+
+FORMATS = {
+    "csv": 'text/csv',
+    "jsonl": 'application/x-ndjson',
+    "ndjson": 'application/x-ndjson',
+}
+
+
+def export_query(kind):
+    if kind == 'venues':
+        query = db.session.query(*Venue.__table__.columns).order_by(Venue.id)
+    elif kind == 'artists':
+        query = db.session.query(*Artist.__table__.columns).order_by(Artist.id)
+    elif kind == 'shows':
+        query = (
+            db.session.query(
+                Show.id,
+                Show.start_time,
+                Show.duration_minutes,
+                Show.venue_id,
+                Venue.name.label('venue_name'),
+                Show.artist_id,
+                Artist.name.label('artist_name'),
+            )
+            .join(Venue, Show.venue_id == Venue.id)
+            .join(Artist, Show.artist_id == Artist.id)
+            .order_by(Show.id)
+        )
+    else:
+        raise ValueError(f'unknown export kind: {kind!r}')
+    return query
+
+
+def export_rows(kind, chunk_size=1000):
+    query = export_query(kind)
+    columns = [column['name'] for column in query.column_descriptions]
+    rows = query.execution_options(stream_results=True).yield_per(chunk_size)
+    return columns, rows
+
+
+#----------Writers---------- #
+
+def plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_value(value):
+    # Genres are joined the way `flask import` splits them.
+    if isinstance(value, list):
+        return ';'.join(value)
+    return plain(value)
+
+
+def generate(kind, fmt, chunk_size=1000):
+    # Yields the export as text chunks of roughly chunk_size rows each.
+    columns, rows = export_rows(kind, chunk_size)
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        write = lambda row: writer.writerow([csv_value(value) for value in row])
+    else:
+        write = lambda row: buffer.write(
+            json.dumps({column: plain(value) for column, value in zip(columns, row)}) + '\n'
+        )
+
+    pending = 0
+    for row in rows:
+        write(row)
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
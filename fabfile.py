@@ -4,10 +4,21 @@ from fabric.contrib.console import confirm
 # prepare for deployment
 
 
+TEST_DB = "sqlite:////tmp/fyyur_test.db"
+
+
 def test():
+    # Runs the test suite, then seeds a throwaway SQLite database and drives
+    # every read-only route through bench_routes.py, which fails on any server
+    # error.
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m pytest -q"
+            " && rm -f /tmp/fyyur_test.db"
+            " && python seed.py --database-url {0} --create --scale 1000"
+            " && python bench_routes.py --database-url {0} --requests 3"
+            " --report bench_report.json".format(TEST_DB),
+            capture=True,
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
@@ -39,9 +50,8 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    # Read-only routes only, against the deployed database.
+    local("heroku run python bench_routes.py --requests 3 --skip export")
 
 
 def deploy():
@@ -0,0 +1,72 @@
+#----------Imports---------- #
+
+import hashlib
+import os
+from flask import g, has_app_context
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from cache import catalog_version
+
+
+#----------Fragment Cache---------- #
+# {% cache 'show', show %}...{% endcache %} renders its body once and reuses
+# the markup for as long as the key is unchanged. Keys are built from the
+# record being rendered (the same dicts the views pass in), so a tile is
+# re-rendered as soon as any field it shows changes. Keys also carry the
+# catalog data version, read once per request, so a write anywhere (including
+# a bulk import that bypasses the ORM) retires fragments whose keys leave out
+# something they show. Old fragments age out of the LRU or expire after
+# CACHE_TTL.
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        # The template and line keep identical keys in two blocks apart.
+        parts = [nodes.Const(f'{parser.name}:{lineno}')]
+        parts.append(parser.parse_expression())
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_cached', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _cached(self, parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = f'fragment:{data_version()}:' + hashlib.sha1(repr(parts).encode()).hexdigest()
+        markup = cache.get(key)
+        if markup is None:
+            markup = caller()
+            cache.set(key, markup)
+        return markup
+
+
+def data_version():
+    if not has_app_context():
+        return catalog_version()
+    if 'fragment_version' not in g:
+        g.fragment_version = catalog_version()
+    return g.fragment_version
+
+
+#----------Setup---------- #
+
+def init_app(app, cache):
+    directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config.get('FRAGMENT_CACHE', True):
+        app.jinja_env.fragment_cache = cache
+
+    @app.before_request
+    def forget_version():
+        g.pop('fragment_version', None)
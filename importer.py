@@ -0,0 +1,206 @@
+#----------Imports---------- #
+
+import csv
+import json
+from werkzeug.datastructures import MultiDict
+from sqlalchemy.exc import SQLAlchemyError
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show
+import counters
+
+
+#----------Row Specs---------- #
+# Each kind maps to its model, the form whose validators a row must pass,
+# and the form fields copied into the inserted row.
+
+SPECS = {
+    "venues": (Venue, VenueForm, [
+        'name', 'city', 'state', 'address', 'phone', 'image_link',
+        'facebook_link', 'website', 'seeking_talent', 'seeking_description',
+        'genres',
+    ]),
+    "artists": (Artist, ArtistForm, [
+        'name', 'city', 'state', 'phone', 'image_link', 'facebook_link',
+        'website', 'seeking_venue', 'seeking_description', 'genres',
+    ]),
+    "shows": (Show, ShowForm, ['start_time']),
+}
+
+FALSE_VALUES = ('', '0', 'false', 'f', 'no', 'n', 'off')
+
+
+#----------Reading---------- #
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(path, fmt):
+    # Yields (line number, row) pairs without reading the whole file. A row
+    # that cannot be parsed is yielded as the ValueError describing it.
+    with open(path, newline='', encoding='utf-8') as source:
+        if fmt == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for number, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            try:
+                yield number, json.loads(text)
+            except ValueError as error:
+                yield number, error
+
+
+#----------Validation---------- #
+
+def form_data(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key == 'genres':
+            genres = value if isinstance(value, list) else value.split(';')
+            for genre in genres:
+                if genre.strip():
+                    data.add(key, genre.strip())
+        elif key.startswith('seeking_') and key != 'seeking_description':
+            if str(value).strip().lower() not in FALSE_VALUES:
+                data.add(key, 'y')
+        else:
+            data.add(key, str(value))
+    return data
+
+
+def validate(kind, row):
+    _, form_class, fields = SPECS[kind]
+    if not isinstance(row, dict):
+        return None, {"row": ['expected an object']}
+    form = form_class(formdata=form_data(row), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    record = {field: form[field].data for field in fields}
+    if kind == 'shows':
+        record['artist_ref'] = row.get('artist_id') or row.get('artist_name')
+        record['venue_ref'] = row.get('venue_id') or row.get('venue_name')
+        missing = dict()
+        if not record['artist_ref']:
+            missing['artist'] = ['artist_id or artist_name is required']
+        if not record['venue_ref']:
+            missing['venue'] = ['venue_id or venue_name is required']
+        if missing:
+            return None, missing
+    return record, None
+
+
+def resolve(model, refs):
+    # Maps each reference (an id or an exact name) in the batch to an id with
+    # one query per model.
+    refs = {str(ref) for ref in refs}
+    ids = {int(ref) for ref in refs if ref.isdigit()}
+    names = refs - {str(ref_id) for ref_id in ids}
+    found = dict()
+    if ids:
+        for row in db.session.query(model.id).filter(model.id.in_(ids)):
+            found[str(row.id)] = row.id
+    if names:
+        for row in db.session.query(model.id, model.name).filter(model.name.in_(names)):
+            found.setdefault(row.name, row.id)
+    return found
+
+
+def resolve_shows(batch):
+    artists = resolve(Artist, (record['artist_ref'] for _, _, record in batch))
+    venues = resolve(Venue, (record['venue_ref'] for _, _, record in batch))
+    resolved, rejected = list(), list()
+    for line, row, record in batch:
+        artist_id = artists.get(str(record['artist_ref']))
+        venue_id = venues.get(str(record['venue_ref']))
+        if artist_id is None or venue_id is None:
+            errors = dict()
+            if artist_id is None:
+                errors['artist'] = [f'unknown artist {record["artist_ref"]!r}']
+            if venue_id is None:
+                errors['venue'] = [f'unknown venue {record["venue_ref"]!r}']
+            rejected.append((line, row, errors))
+            continue
+        resolved.append((line, row, {
+            "artist_id": artist_id,
+            "venue_id": venue_id,
+            "start_time": record['start_time'],
+        }))
+    return resolved, rejected
+
+
+#----------Loading---------- #
+
+def insert_batch(model, batch):
+    # One executemany per batch; if the database rejects it, fall back to row
+    # by row so a single bad row does not sink the batch.
+    rejected = list()
+    try:
+        db.session.execute(model.__table__.insert(), [record for _, _, record in batch])
+        db.session.commit()
+        return len(batch), rejected
+    except SQLAlchemyError:
+        db.session.rollback()
+    inserted = 0
+    for line, row, record in batch:
+        try:
+            db.session.execute(model.__table__.insert(), record)
+            db.session.commit()
+            inserted += 1
+        except SQLAlchemyError as error:
+            db.session.rollback()
+            rejected.append((line, row, {"database": [str(getattr(error, 'orig', None) or error)]}))
+    return inserted, rejected
+
+
+def refresh_counters(batch):
+    counters.refresh(Venue, {record['venue_id'] for _, _, record in batch})
+    counters.refresh(Artist, {record['artist_id'] for _, _, record in batch})
+    db.session.commit()
+
+
+def import_rows(kind, rows, batch_size=1000, on_error=None, on_progress=None):
+    model = SPECS[kind][0]
+    stats = {"read": 0, "inserted": 0, "rejected": 0}
+
+    def reject(line, row, errors):
+        stats['rejected'] += 1
+        if on_error is not None:
+            on_error(line, row, errors)
+
+    def flush(batch):
+        if kind == 'shows':
+            batch, unresolved = resolve_shows(batch)
+            for line, row, errors in unresolved:
+                reject(line, row, errors)
+        if batch:
+            inserted, failed = insert_batch(model, batch)
+            stats['inserted'] += inserted
+            if kind == 'shows':
+                refresh_counters(batch)
+            for line, row, errors in failed:
+                reject(line, row, errors)
+        if on_progress is not None:
+            on_progress(stats)
+
+    batch = list()
+    for line, row in rows:
+        stats['read'] += 1
+        if isinstance(row, Exception):
+            reject(line, None, {"row": [str(row)]})
+            continue
+        record, errors = validate(kind, row)
+        if errors:
+            reject(line, row, errors)
+            continue
+        batch.append((line, row, record))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = list()
+    if batch:
+        flush(batch)
+    return stats
@@ -0,0 +1,226 @@
+#----------Imports---------- #
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import Float, and_, case, cast, false, func, select, true, union
+from cache import catalog_version, on_catalog_commit
+from models import db, Venue, Artist, Show
+from queries import SEEKING, genre_count, has_any_genre, shared_genre_count
+
+
+#----------Scoring---------- #
+# Matching ranks every seeking artist (or venue) against one venue (or
+# artist). The whole ranking is one statement: the database scores each
+# candidate row from its genre overlap with the subject, its location and
+# the past shows the two share, then sorts and cuts it to the top results.
+# Only rows that can score are scored. Their ids come from a UNION of
+# branches that each have an index: shared genres (&& on the GIN index on
+# PostgreSQL; on SQLite a scan of the JSON text), the subject's state
+# (ix_<Model>_state_city) and past shows together (ix_Show_<...>_start_time).
+
+OTHER = {Venue: Artist, Artist: Venue}
+
+WEIGHTS = {
+    "genre": 3.0,    # times the Jaccard overlap of the two genre sets
+    "city": 2.0,     # same city and state
+    "state": 1.0,    # same state
+    "history": 1.5,  # times ln(1 + past shows together)
+}
+
+
+def history(model, item_id, now):
+    # Past shows of this venue with each artist (or of this artist at each
+    # venue), from the (venue_id | artist_id, start_time) index.
+    mine, theirs = (Show.venue_id, Show.artist_id) if model is Venue else (Show.artist_id, Show.venue_id)
+    return (
+        select([theirs.label('candidate_id'), func.count().label('shows')])
+        .where(and_(mine == item_id, Show.start_time <= now))
+        .group_by(theirs)
+        .alias('history')
+    )
+
+
+def candidate_ids(other, subject, genres, past):
+    seeking = SEEKING[other] == true()
+    branches = [select([past.c.candidate_id.label('id')])]
+    if genres:
+        branches.append(select([other.id]).where(and_(seeking, has_any_genre(other.genres, genres))))
+    if subject.state is not None:
+        branches.append(select([other.id]).where(and_(seeking, other.state == subject.state)))
+    return union(*branches).alias('candidate_ids')
+
+
+def ranked(model, subject, limit, past):
+    other = OTHER[model]
+    genres = sorted(set(subject.genres or ()))
+    if subject.state is None:
+        same_state = same_city = false()
+    else:
+        same_state = other.state == subject.state
+        same_city = and_(same_state, other.city == subject.city)
+    ids = candidate_ids(other, subject, genres, past)
+    candidates = (
+        select([
+            other.id, other.name, other.city, other.state, other.genres,
+            shared_genre_count(other.genres, genres).label('shared'),
+            genre_count(other.genres).label('size'),
+            case([(same_city, 1.0)], else_=0.0).label('same_city'),
+            case([(same_state, 1.0)], else_=0.0).label('same_state'),
+            func.coalesce(past.c.shows, 0).label('past_shows'),
+        ])
+        .select_from(
+            other.__table__
+            .join(ids, ids.c.id == other.id)
+            .outerjoin(past, past.c.candidate_id == other.id)
+        )
+        .where(SEEKING[other] == true())
+        .alias('candidate')
+    )
+    union_size = len(genres) + candidates.c.size - candidates.c.shared
+    overlap = case([(union_size > 0, cast(candidates.c.shared, Float) / union_size)], else_=0.0)
+    score = (
+        WEIGHTS['genre'] * overlap
+        + WEIGHTS['city'] * candidates.c.same_city
+        + WEIGHTS['state'] * candidates.c.same_state
+        + WEIGHTS['history'] * func.ln(1 + candidates.c.past_shows)
+    ).label('score')
+    statement = (
+        select([candidates, score, func.count().over().label('total')])
+        .order_by(score.desc(), candidates.c.id)
+        .limit(limit)
+    )
+    rows = db.session.execute(statement).fetchall()
+    data = [{
+        "id": row.id,
+        "name": row.name,
+        "city": row.city,
+        "state": row.state,
+        "score": round(row.score, 4),
+        "shared_genres": sorted(set(row.genres or ()) & set(genres)),
+        "past_shows": row.past_shows,
+    } for row in rows]
+    return {"count": rows[0].total if rows else 0, "data": data}
+
+
+def score(subject, values, past_shows):
+    # The SQL score of one candidate, from its column values.
+    genres = set(subject['genres'])
+    theirs = values['genres'] or ()
+    shared = sum(1 for genre in theirs if genre in genres)
+    union_size = len(genres) + len(theirs) - shared
+    same_state = subject['state'] is not None and values['state'] == subject['state']
+    same_city = same_state and values['city'] == subject['city']
+    return (
+        WEIGHTS['genre'] * (shared / union_size if union_size else 0.0)
+        + WEIGHTS['city'] * same_city
+        + WEIGHTS['state'] * same_state
+        + WEIGHTS['history'] * math.log(1 + past_shows)
+    )
+
+
+#----------Cache---------- #
+# Rankings are cached per subject and result size, at the catalog data
+# version they were built at, so a write committed by any process retires
+# them. Writes committed in this process are checked against each ranking
+# built at the version just left behind: one that cannot move it (another
+# subject, or a candidate outside the top results whose new score would not
+# reach them and who was and still is, or never was, a candidate) moves the
+# ranking on to the new version; anything else, or a change whose relevant
+# columns were not loaded, drops it. MATCH_CACHE_TTL bounds how long
+# past-show history can lag as upcoming shows turn into past ones.
+
+_lock = threading.Lock()
+_rankings = OrderedDict()
+
+
+class Ranking:
+
+    def __init__(self, version, expires_at, subject, past_shows, result):
+        self.version = version
+        self.expires_at = expires_at
+        self.subject = subject
+        self.past_shows = past_shows
+        self.result = result
+        self.ids = {item['id'] for item in result['data']}
+
+    def is_candidate(self, seeking, row_id, values):
+        if not values[seeking]:
+            return False
+        if row_id in self.past_shows or set(values['genres'] or ()) & set(self.subject['genres']):
+            return True
+        return self.subject['state'] is not None and values['state'] == self.subject['state']
+
+    def unaffected(self, model, item_id, limit, changes):
+        other = OTHER[model]
+        mine = 'venue_id' if model is Venue else 'artist_id'
+        seeking = SEEKING[other].key
+        needed = ('genres', 'city', 'state', seeking)
+        data = self.result['data']
+        for change in changes:
+            states = [values for values in (change.before, None if change.deleted else change.values)
+                      if values is not None]
+            if change.model is Show:
+                # A show of the subject, or one whose side was not loaded.
+                if any(values.get(mine, item_id) == item_id for values in states):
+                    return False
+            elif change.model is model:
+                if change.id == item_id:
+                    return False
+            elif change.id in self.ids:
+                return False
+            else:
+                if any(key not in values for values in states for key in needed):
+                    return False
+                was = change.before is not None and self.is_candidate(seeking, change.id, change.before)
+                now = not change.deleted and self.is_candidate(seeking, change.id, change.values)
+                if was != now:
+                    return False
+                if now and (len(data) < limit or score(
+                        self.subject, change.values, self.past_shows.get(change.id, 0)
+                ) >= data[-1]['score'] - 1e-4):
+                    return False
+        return True
+
+
+def reset():
+    with _lock:
+        _rankings.clear()
+
+
+@on_catalog_commit
+def _committed(changes, previous, current):
+    with _lock:
+        for key, ranking in list(_rankings.items()):
+            if ranking.version == previous and ranking.unaffected(*key, changes):
+                ranking.version = current
+            else:
+                del _rankings[key]
+
+
+def matches(model, item_id, limit=10, max_entries=512, ttl=600):
+    # Best seeking counterparts for a venue or artist, or None if it does not
+    # exist.
+    key = (model, item_id, limit)
+    version = catalog_version()
+    with _lock:
+        cached = _rankings.get(key)
+        if cached is not None and cached.version == version and cached.expires_at > time.monotonic():
+            _rankings.move_to_end(key)
+            return cached.result
+    subject = db.session.query(model.id, model.genres, model.city, model.state) \
+        .filter(model.id == item_id).first()
+    if subject is None:
+        return None
+    past = history(model, subject.id, datetime.now())
+    past_shows = dict(db.session.execute(select([past.c.candidate_id, past.c.shows])).fetchall())
+    result = ranked(model, subject, limit, past)
+    profile = {"genres": sorted(set(subject.genres or ())), "city": subject.city, "state": subject.state}
+    with _lock:
+        _rankings[key] = Ranking(version, time.monotonic() + ttl, profile, past_shows, result)
+        _rankings.move_to_end(key)
+        while len(_rankings) > max_entries:
+            _rankings.popitem(last=False)
+    return result
@@ -0,0 +1,264 @@
+#----------Imports---------- #
+
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, request
+from flask.signals import before_render_template, template_rendered
+
+
+#----------Registry---------- #
+# Counters and histograms live in plain dicts behind one lock, so recording a
+# request costs a few dict updates. Under gunicorn every worker has its own
+# registry; when METRICS_DIR is set each worker also writes a JSON snapshot
+# there (at most every METRICS_FLUSH_SECONDS, and whenever it serves
+# /metrics), and /metrics adds up the snapshots of all workers. Counters of
+# workers that have exited keep counting so totals never go backwards;
+# gauges (pool usage) only include live workers. Clear the directory when
+# the server starts.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "fyyur_http_requests_total": ('counter', 'Requests served, by route and status.'),
+    "fyyur_http_request_duration_seconds": ('histogram', 'Time to build each response.'),
+    "fyyur_http_request_db_seconds": ('histogram', 'Time spent in SQL per request.'),
+    "fyyur_db_queries_total": ('counter', 'SQL statements run, by route.'),
+    "fyyur_template_render_seconds": ('histogram', 'Time to render each template.'),
+    "fyyur_cache_hits_total": ('counter', 'Cache lookups that found an entry.'),
+    "fyyur_cache_misses_total": ('counter', 'Cache lookups that found nothing.'),
+    "fyyur_cache_hit_ratio": ('gauge', 'Hits over lookups, across all workers.'),
+    "fyyur_db_pool_size": ('gauge', 'Connections kept open by the pools.'),
+    "fyyur_db_pool_checked_out": ('gauge', 'Connections currently in use.'),
+    "fyyur_db_pool_overflow": ('gauge', 'Connections open beyond the pool size.'),
+    "fyyur_db_pool_checkouts_total": ('counter', 'Connections handed out by the pools.'),
+    "fyyur_db_pool_timeouts_total": ('counter', 'Checkouts that gave up waiting.'),
+    "fyyur_db_pool_wait_seconds_total": ('counter', 'Time spent waiting for a connection.'),
+}
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = dict()
+        self.histograms = dict()
+        self.collectors = list()
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+            histogram[0][bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram[1] += value
+
+    def snapshot(self):
+        # Collectors read state owned elsewhere (pools, caches) at this moment.
+        counters, gauges = dict(), dict()
+        for collect in self.collectors:
+            for kind, name, labels, value in collect():
+                (counters if kind == 'counter' else gauges)[encode(name, labels)] = value
+        with self.lock:
+            counters.update((encode(*key), value) for key, value in self.counters.items())
+            histograms = {encode(*key): [list(buckets), total]
+                          for key, (buckets, total) in self.histograms.items()}
+        return {"pid": os.getpid(), "counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+def encode(name, labels):
+    return json.dumps([name, list(labels)])
+
+
+def decode(key):
+    name, labels = json.loads(key)
+    return name, tuple(tuple(pair) for pair in labels)
+
+
+registry = Registry()
+
+
+#----------Worker Snapshots---------- #
+
+class Snapshots:
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self.written_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, pid):
+        return os.path.join(self.directory, f'metrics_{pid}.json')
+
+    def write(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.written_at < self.interval:
+            return
+        self.written_at = now
+        path = self.path(os.getpid())
+        partial = f'{path}.tmp'
+        with open(partial, 'w') as handle:
+            json.dump(registry.snapshot(), handle)
+        os.replace(partial, path)
+
+    def read(self):
+        snapshots = list()
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            try:
+                with open(path) as handle:
+                    snapshots.append(json.load(handle))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge(snapshots):
+    counters, gauges, histograms = dict(), dict(), dict()
+    for snapshot in snapshots:
+        for key, value in snapshot['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        if snapshot['pid'] == os.getpid() or alive(snapshot['pid']):
+            for key, value in snapshot['gauges'].items():
+                gauges[key] = gauges.get(key, 0) + value
+        for key, (buckets, total) in snapshot['histograms'].items():
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+    return counters, gauges, histograms
+
+
+#----------Exposition---------- #
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def hit_ratios(counters):
+    lookups = dict()
+    for key, value in counters.items():
+        name, labels = decode(key)
+        if name in ('fyyur_cache_hits_total', 'fyyur_cache_misses_total'):
+            hits, total = lookups.get(labels, (0, 0))
+            lookups[labels] = (hits + (value if name == 'fyyur_cache_hits_total' else 0), total + value)
+    return {encode('fyyur_cache_hit_ratio', labels): hits / total
+            for labels, (hits, total) in lookups.items() if total}
+
+
+def render(counters, gauges, histograms):
+    gauges = dict(gauges, **hit_ratios(counters))
+    families = dict()
+    for kind, series in (('counter', counters), ('gauge', gauges), ('histogram', histograms)):
+        for key, value in series.items():
+            name, labels = decode(key)
+            families.setdefault(name, (kind, list()))[1].append((labels, value))
+
+    lines = list()
+    for name in sorted(families):
+        kind, samples = families[name]
+        lines.append(f'# HELP {name} {HELP.get(name, (kind, name))[1]}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(samples):
+            if kind != 'histogram':
+                lines.append(f'{name}{label_text(labels)} {value}')
+                continue
+            buckets, total = value
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{label_text(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{label_text(labels)} {total}')
+            lines.append(f'{name}_count{label_text(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+#----------Setup---------- #
+
+def init_app(app, caches, pool_metrics):
+    directory = app.config.get('METRICS_DIR')
+    snapshots = Snapshots(directory, app.config['METRICS_FLUSH_SECONDS']) if directory else None
+
+    def collect():
+        for name, cache in caches.items():
+            stats = cache.stats()
+            yield 'counter', 'fyyur_cache_hits_total', (('cache', name),), stats['hits']
+            yield 'counter', 'fyyur_cache_misses_total', (('cache', name),), stats['misses']
+        pool = pool_metrics.stats()
+        for key in ('size', 'checked_out', 'overflow'):
+            yield 'gauge', f'fyyur_db_pool_{key}', (), pool[key]
+        yield 'counter', 'fyyur_db_pool_checkouts_total', (), pool['checkouts']
+        yield 'counter', 'fyyur_db_pool_timeouts_total', (), pool['timeouts']
+        yield 'counter', 'fyyur_db_pool_wait_seconds_total', (), pool['wait_seconds_total']
+
+    registry.collectors.append(collect)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record(response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        # The route pattern, not the path, keeps the label set small.
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (('method', request.method), ('route', route))
+        registry.inc('fyyur_http_requests_total', labels + (('status', str(response.status_code)),))
+        registry.observe('fyyur_http_request_duration_seconds', labels, time.perf_counter() - started)
+        stats = g.get('sql_stats')
+        if stats is not None:
+            registry.observe('fyyur_http_request_db_seconds', labels, stats.seconds)
+            registry.inc('fyyur_db_queries_total', labels, stats.count)
+        if snapshots is not None:
+            snapshots.write()
+        return response
+
+    # Flask's template signals need blinker (in requirements.txt).
+    @before_render_template.connect_via(app)
+    def render_started(sender, template, context, **extra):
+        g.setdefault('render_started', list()).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def render_finished(sender, template, context, **extra):
+        stack = g.get('render_started')
+        if stack:
+            registry.observe('fyyur_template_render_seconds',
+                             (('template', template.name),), time.perf_counter() - stack.pop())
+
+    def exposition():
+        if snapshots is None:
+            counters, gauges, histograms = merge([registry.snapshot()])
+        else:
+            snapshots.write(force=True)
+            counters, gauges, histograms = merge(snapshots.read())
+        return Response(render(counters, gauges, histograms),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    return exposition
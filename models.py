@@ -3,16 +3,25 @@
 #----------------------------------------------------------------------------#
 
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
+from routing import RoutingSQLAlchemy
 
 
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
+
+# Genres are native arrays on PostgreSQL and JSON lists on SQLite test runs.
+GenreList = db.ARRAY(db.String).with_variant(db.JSON, 'sqlite')
 
 
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -27,8 +36,13 @@ class Venue(db.Model):
     website = db.Column(db.String(250))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String))
-    shows = db.relationship('Show', backref='Venue', lazy=True)
+    genres = db.Column(GenreList)
+    shows = db.relationship('Show', backref='Venue', lazy=True, cascade='all, delete')
+
+    # Maintained by counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime, index=True)
 
     def __repr__(self):
         return f'<Venue{self.id} name: {self.name} city:{self.city} state:{self.state} address:{self.address} phone:{self.phone}\
@@ -37,13 +51,19 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_state_city', 'state', 'city'),
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String))
+    genres = db.Column(GenreList)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
@@ -51,7 +71,12 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
     website = db.Column(db.String(120))
-    shows = db.relationship('Show', backref='Artist', lazy=True)
+    shows = db.relationship('Show', backref='Artist', lazy=True, cascade='all, delete')
+
+    # Maintained by counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime, index=True)
 
     def __repr__(self):
         return f'<Artist{self.id} name:{self.name} city:{self.city} state:{self.state} phone:{self.phone}\
@@ -62,12 +87,18 @@ class Artist(db.Model):
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey(Venue.id), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey(Artist.id), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False,
                            default=datetime.utcnow)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=120, server_default='120')
 
     def __repr__(self):
         return f'<Show:{self.id},Artist:{self.artist_id} Venue:{self.venue_id} start_time{self.start_time}>'
\ No newline at end of file
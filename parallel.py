@@ -0,0 +1,45 @@
+#----------Imports---------- #
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g
+
+
+#----------Parallel Queries---------- #
+# Flask 1.1 and SQLAlchemy 1.3 have no async views or engines, so pages with
+# several independent queries run them on a shared thread pool instead. Each
+# task gets its own app context and therefore its own scoped session and
+# connection, released when the context is torn down. Tasks read from the
+# same database (primary or replica) as the request that started them, and
+# their statements count towards that request's SQL stats.
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config['QUERY_THREADS'],
+            thread_name_prefix='fyyur-query',
+        )
+    return _executor
+
+
+def run_parallel(*calls):
+    # Runs zero-argument callables and returns their results in order. An
+    # exception in any call (including a 404 abort) is re-raised here.
+    app = current_app._get_current_object()
+    if not app.config['PARALLEL_QUERIES'] or len(calls) < 2:
+        return [call() for call in calls]
+
+    route = g.get('db_route')
+    stats = g.get('sql_stats')
+
+    def run(call):
+        with app.app_context():
+            g.db_route = route
+            g.sql_stats = stats
+            return call()
+
+    futures = [executor().submit(run, call) for call in calls]
+    return [future.result() for future in futures]
@@ -0,0 +1,447 @@
+#----------Imports---------- #
+
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, case, false, func, literal, literal_column, select, true
+from sqlalchemy.dialects import postgresql
+from models import db, Venue, Artist, Show
+
+
+#----------Cursors---------- #
+# Keyset cursors are "<iso start_time>_<id>" strings so they survive a
+# round trip through a query string.
+
+def encode_cursor(start_time, row_id):
+    return f'{start_time.isoformat()}_{row_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        start_time, row_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(start_time), int(row_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f'invalid cursor: {cursor!r}')
+
+
+def after_cursor(query, time_column, id_column, cursor):
+    # (start_time, id) > (cursor_time, cursor_id), spelled out so it can use
+    # the start_time index on every backend.
+    after_time, after_id = cursor
+    return query.filter(or_(
+        time_column > after_time,
+        and_(time_column == after_time, id_column > after_id),
+    ))
+
+
+def before_cursor(query, time_column, id_column, cursor):
+    before_time, before_id = cursor
+    return query.filter(or_(
+        time_column < before_time,
+        and_(time_column == before_time, id_column < before_id),
+    ))
+
+
+def keyset_page(query, limit):
+    # Fetches one row past the page to learn whether another page exists.
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, next_cursor
+
+
+#----------Venues---------- #
+
+def upcoming_count(now):
+    return func.coalesce(
+        func.sum(case([(Show.start_time > now, 1)], else_=0)), 0
+    )
+
+
+def past_count(now):
+    return func.coalesce(
+        func.sum(case([(Show.start_time <= now, 1)], else_=0)), 0
+    )
+
+
+def venue_areas(page=1, per_page=25):
+    # Every venue of the requested areas in one query, with upcoming-show
+    # counts read from the precomputed counters; dense_rank numbers the
+    # (state, city) areas so whole areas are paged rather than individual
+    # venues.
+    area_rank = func.dense_rank().over(order_by=(Venue.state, Venue.city))
+    venues = (
+        db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.city,
+            Venue.state,
+            Venue.upcoming_shows_count.label('num_shows'),
+            area_rank.label('area_rank'),
+        )
+        .subquery()
+    )
+    first = (page - 1) * per_page
+    rows = (
+        db.session.query(venues)
+        .filter(venues.c.area_rank > first)
+        .filter(venues.c.area_rank <= first + per_page + 1)
+        .order_by(venues.c.area_rank, venues.c.name)
+        .all()
+    )
+
+    areas = list()
+    has_more = False
+    for row in rows:
+        if row.area_rank > first + per_page:
+            has_more = True
+            break
+        if not areas or areas[-1]['rank'] != row.area_rank:
+            areas.append({
+                "rank": row.area_rank,
+                "city": row.city,
+                "state": row.state,
+                "venues": list(),
+            })
+        areas[-1]['venues'].append({
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.num_shows,
+        })
+    return areas, has_more
+
+
+#----------Shows---------- #
+
+def feed_query():
+    return (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Venue.id.label('venue_id'),
+            Venue.name.label('venue_name'),
+            Artist.id.label('artist_id'),
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .join(Artist, Show.artist_id == Artist.id)
+    )
+
+
+def feed_data(rows):
+    return [{
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+        "start_time": row.start_time
+    } for row in rows]
+
+
+def show_feed(after=None, limit=50):
+    # One joined query per page, ordered by (start_time, id) so the next page
+    # picks up from the last row instead of using OFFSET.
+    query = feed_query()
+    if after is not None:
+        query = after_cursor(query, Show.start_time, Show.id, after)
+    rows, next_cursor = keyset_page(query.order_by(Show.start_time, Show.id), limit)
+    return feed_data(rows), next_cursor
+
+
+def on_postgresql():
+    # Asks the routed bind, since a replica need not run the primary's backend.
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def escape_like(term):
+    # '!' rather than a backslash, which some dialects double when rendering
+    # the ESCAPE literal.
+    return term.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+def contains_genre(column, genre):
+    # The genre as it is written in the JSON text, quotes and escapes
+    # included, so it only matches a whole list element.
+    return db.cast(column, db.Text).like(f'%{escape_like(json.dumps(genre))}%', escape='!')
+
+
+def has_genres(column, genres):
+    # genres is an ARRAY on PostgreSQL, where @> can use the GIN index, and a
+    # JSON list on SQLite, where each quoted name is matched in the JSON text.
+    if on_postgresql():
+        genres = db.cast(postgresql.array(list(genres)), postgresql.ARRAY(db.String))
+        return column.op('@>')(genres)
+    return and_(*(contains_genre(column, genre) for genre in genres))
+
+
+def has_genre(column, genre):
+    return has_genres(column, [genre])
+
+
+def has_any_genre(column, genres):
+    # && on PostgreSQL, which the GIN index also serves.
+    if not genres:
+        return false()
+    if on_postgresql():
+        genres = db.cast(postgresql.array(list(genres)), postgresql.ARRAY(db.String))
+        return column.op('&&')(genres)
+    return or_(*(contains_genre(column, genre) for genre in genres))
+
+
+def genre_count(column):
+    if on_postgresql():
+        return func.coalesce(func.cardinality(column), 0)
+    return func.coalesce(func.json_array_length(column), 0)
+
+
+def shared_genre_count(column, genres):
+    # Per row, how many of `genres` its genre list holds.
+    if not genres:
+        return literal(0)
+    if on_postgresql():
+        each, value = func.unnest(column).alias('genre'), literal_column('genre')
+    else:
+        each, value = func.json_each(column).alias('genre'), literal_column('genre.value')
+    return select([func.count()]).select_from(each).where(value.in_(list(genres))).as_scalar()
+
+
+def group_by_day(shows):
+    days = list()
+    for show in shows:
+        day = show['start_time'].date()
+        if not days or days[-1]['date'] != day:
+            days.append({"date": day, "shows": list()})
+        days[-1]['shows'].append(show)
+    return days
+
+
+def shows_between(start, end, city=None, state=None, genre=None, after=None, limit=50):
+    # Shows starting in [start, end) grouped by day, a page at a time. The
+    # range is read in (start_time, id) order from ix_Show_start_time_id;
+    # with a selective city the planner can instead start from
+    # ix_Venue_state_city and probe ix_Show_venue_id_start_time per venue.
+    # A genre matches the genres of the artist playing the show.
+    query = feed_query().filter(Show.start_time >= start, Show.start_time < end)
+    if city:
+        query = query.filter(Venue.city == city)
+    if state:
+        query = query.filter(Venue.state == state)
+    if genre:
+        query = query.filter(has_genre(Artist.genres, genre))
+    if after is not None:
+        query = after_cursor(query, Show.start_time, Show.id, after)
+    rows, next_cursor = keyset_page(query.order_by(Show.start_time, Show.id), limit)
+    return group_by_day(feed_data(rows)), next_cursor
+
+
+def venue_availability(venue_id, start, days, lookback):
+    # The venue's bookings for each of `days` days from `start` (a date),
+    # from one range scan of ix_Show_venue_id_start_time. The scan reaches
+    # back by the longest show duration so a late show running past midnight
+    # into the first day is included; a show appears on every day it spans.
+    first = datetime.combine(start, datetime.min.time())
+    end = first + timedelta(days=days)
+    rows = (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Show.duration_minutes,
+            Artist.id.label('artist_id'),
+            Artist.name.label('artist_name'),
+        )
+        .join(Artist, Show.artist_id == Artist.id)
+        .filter(Show.venue_id == venue_id)
+        .filter(Show.start_time > first - lookback, Show.start_time < end)
+        .order_by(Show.start_time, Show.id)
+    )
+    calendar = [{"date": start + timedelta(days=offset), "bookings": list()} for offset in range(days)]
+    for row in rows:
+        show_end = row.start_time + timedelta(minutes=row.duration_minutes)
+        booking = {
+            "show_id": row.id,
+            "artist_id": row.artist_id,
+            "artist_name": row.artist_name,
+            "start_time": row.start_time,
+            "end_time": show_end,
+        }
+        day = max(row.start_time.date(), start)
+        while day < end.date() and datetime.combine(day, datetime.min.time()) < show_end:
+            calendar[(day - start).days]['bookings'].append(booking)
+            day += timedelta(days=1)
+    for day in calendar:
+        day['available'] = not day['bookings']
+    return calendar
+
+
+def show_counts(column, value, now):
+    # Upcoming and past totals for one venue or artist in a single pass.
+    row = (
+        db.session.query(
+            upcoming_count(now).label('upcoming'),
+            past_count(now).label('past'),
+        )
+        .filter(column == value)
+        .one()
+    )
+    return row.upcoming, row.past
+
+
+def show_page(query, now, upcoming, limit, cursor=None):
+    # Upcoming shows run soonest first, past shows most recent first; both
+    # continue from the cursor of the previous page.
+    if upcoming:
+        query = query.filter(Show.start_time > now)
+        if cursor is not None:
+            query = after_cursor(query, Show.start_time, Show.id, cursor)
+        query = query.order_by(Show.start_time, Show.id)
+    else:
+        query = query.filter(Show.start_time <= now)
+        if cursor is not None:
+            query = before_cursor(query, Show.start_time, Show.id, cursor)
+        query = query.order_by(Show.start_time.desc(), Show.id.desc())
+    return keyset_page(query, limit)
+
+
+def venue_shows(venue_id, now, upcoming, limit, cursor=None):
+    query = (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Artist.id.label('artist_id'),
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+        )
+        .join(Artist, Show.artist_id == Artist.id)
+        .filter(Show.venue_id == venue_id)
+    )
+    rows, next_cursor = show_page(query, now, upcoming, limit, cursor)
+    data = [{
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "artist_image_link": row.artist_image_link,
+        "start_time": row.start_time
+    } for row in rows]
+    return data, next_cursor
+
+
+def artist_shows(artist_id, now, upcoming, limit, cursor=None):
+    # The artist's timeline: where each show is played, with the venue
+    # columns joined in so the page needs no per-venue lookups.
+    query = (
+        db.session.query(
+            Show.id,
+            Show.start_time,
+            Venue.id.label('venue_id'),
+            Venue.name.label('venue_name'),
+            Venue.image_link.label('venue_image_link'),
+        )
+        .join(Venue, Show.venue_id == Venue.id)
+        .filter(Show.artist_id == artist_id)
+    )
+    rows, next_cursor = show_page(query, now, upcoming, limit, cursor)
+    data = [{
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "venue_image_link": row.venue_image_link,
+        "start_time": row.start_time
+    } for row in rows]
+    return data, next_cursor
+
+
+#----------Browse---------- #
+# Faceted browsing of venues or artists. One statement returns the requested
+# page together with the facet counts of everything matching the filters:
+# the matches are a CTE, and the total and each facet are uncorrelated
+# subqueries aggregating it (facets into JSON objects) in a one-row summary.
+# The page is LEFT JOINed to that row, so a page past the end still returns
+# the summary, as one row with no item.
+
+SEEKING = {
+    Venue: Venue.seeking_talent,
+    Artist: Artist.seeking_venue,
+}
+
+
+def facet_object(values):
+    # {value: count} for a one-column selectable of facet values.
+    values = values.alias()
+    counts = (
+        select([values.c.value, func.count().label('n')])
+        .where(values.c.value.isnot(None))
+        .group_by(values.c.value)
+        .alias()
+    )
+    if on_postgresql():
+        aggregate = func.json_object_agg(counts.c.value, counts.c.n, type_=db.JSON)
+    else:
+        aggregate = func.json_group_object(counts.c.value, counts.c.n, type_=db.JSON)
+    return select([aggregate]).as_scalar()
+
+
+def genre_values(matched):
+    if on_postgresql():
+        return select([func.unnest(matched.c.genres).label('value')])
+    each = func.json_each(matched.c.genres).alias('genre')
+    return select([literal_column('genre.value').label('value')]).select_from(matched).select_from(each)
+
+
+def browse(model, genres=(), city=None, state=None, seeking=None, page=1, per_page=25):
+    seeking_column = SEEKING[model]
+    conditions = list()
+    if genres:
+        conditions.append(has_genres(model.genres, genres))
+    if city:
+        conditions.append(model.city == city)
+    if state:
+        conditions.append(model.state == state)
+    if seeking is not None:
+        conditions.append(seeking_column == seeking)
+    matched = (
+        select([
+            model.id, model.name, model.city, model.state, model.genres,
+            model.image_link, seeking_column.label('seeking'),
+        ])
+        .where(and_(true(), *conditions))
+        .cte('matched')
+    )
+    summary = select([
+        select([func.count()]).select_from(matched).as_scalar().label('total'),
+        facet_object(genre_values(matched)).label('genre_facets'),
+        facet_object(select([matched.c.state.label('value')])).label('state_facets'),
+        facet_object(select([matched.c.city.label('value')])).label('city_facets'),
+        select([func.count()]).where(matched.c.seeking == true()).as_scalar().label('seeking_count'),
+    ]).alias('summary')
+    page_rows = (
+        select([matched])
+        .order_by(matched.c.name, matched.c.id)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+        .alias('page')
+    )
+    statement = (
+        select([summary, page_rows])
+        .select_from(summary.outerjoin(page_rows, true()))
+        .order_by(page_rows.c.name, page_rows.c.id)
+    )
+    rows = db.session.execute(statement).fetchall()
+
+    first = rows[0]
+    facets = {
+        "genres": first.genre_facets or {},
+        "states": first.state_facets or {},
+        "cities": first.city_facets or {},
+        "seeking": first.seeking_count,
+    }
+    data = [{
+        "id": row.id,
+        "name": row.name,
+        "city": row.city,
+        "state": row.state,
+        "genres": row.genres,
+        "image_link": row.image_link,
+        "seeking": bool(row.seeking),
+    } for row in rows if row.id is not None]
+    return data, facets, first.total
@@ -0,0 +1,144 @@
+#----------Imports---------- #
+
+import itertools
+import threading
+import time
+from flask import g, has_app_context, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm, text
+from sqlalchemy.exc import DBAPIError
+from dbpool import engine_options
+
+
+#----------Replica Router---------- #
+# Read-only requests (GET/HEAD) are sent round-robin to the replicas listed
+# in SQLALCHEMY_REPLICA_URIS, which are registered as binds named
+# replica_0, replica_1, ... Everything else, including anything flushed
+# inside a read request, stays on the primary. After a visitor writes, their
+# reads stay on the primary for REPLICA_READ_AFTER_WRITE_SECONDS so the
+# redirect that follows an edit sees the edit.
+
+def replica_binds(config):
+    return {f'replica_{i}': uri for i, uri in enumerate(config.get('SQLALCHEMY_REPLICA_URIS') or ())}
+
+
+class ReplicaRouter:
+
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.Lock()
+        self.keys = None
+        self.cycle = None
+        self.down = dict()
+
+    def replica_keys(self, app):
+        if self.keys is None:
+            self.keys = sorted(replica_binds(app.config))
+            self.cycle = itertools.cycle(self.keys)
+        return self.keys
+
+    def healthy(self, app, key):
+        # A replica that failed a check is skipped until its retry time, then
+        # probed again with SELECT 1.
+        retry_at = self.down.get(key)
+        if retry_at is None:
+            return True
+        if time.monotonic() < retry_at:
+            return False
+        try:
+            with self.db.get_engine(app, bind=key).connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except DBAPIError:
+            self.mark_down(app, key)
+            return False
+        self.down.pop(key, None)
+        return True
+
+    def mark_down(self, app, key):
+        self.down[key] = time.monotonic() + app.config['REPLICA_HEALTH_RETRY_SECONDS']
+        app.logger.warning('Replica %s is unavailable; taking it out of rotation', key)
+
+    def pick(self, app):
+        keys = self.replica_keys(app)
+        for _ in range(len(keys)):
+            with self.lock:
+                key = next(self.cycle)
+            if self.healthy(app, key):
+                return key
+        return None
+
+    def stats(self):
+        return {
+            "replicas": self.keys or [],
+            "down": sorted(self.down),
+        }
+
+
+#----------Session---------- #
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_app_context() and g.get('db_route'):
+            return self.db_engine(g.db_route)
+        return super().get_bind(mapper, clause)
+
+    def db_engine(self, key):
+        return self.app.extensions['sqlalchemy'].db.get_engine(self.app, bind=key)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = ReplicaRouter(self)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        # Called once per bind, so a SQLite stand-in replica keeps SQLite
+        # defaults next to a pooled PostgreSQL primary. SQLALCHEMY_ENGINE_OPTIONS
+        # still overrides these.
+        result = super().apply_driver_hacks(app, sa_url, options)
+        options.update(engine_options(sa_url, app.config))
+        return result
+
+    def init_app(self, app):
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.update(replica_binds(app.config))
+        app.config['SQLALCHEMY_BINDS'] = binds or None
+        super().init_app(app)
+        if binds:
+            self.route_reads(app)
+
+    def route_reads(self, app):
+        router = self.router
+
+        @app.before_request
+        def choose_route():
+            if request.method not in ('GET', 'HEAD'):
+                return
+            if session.get('_primary_until', 0) > time.time():
+                return
+            g.db_route = router.pick(app)
+
+        @event.listens_for(RoutingSession, 'after_flush')
+        def flushed(db_session, flush_context):
+            db_session.info['wrote'] = True
+
+        @event.listens_for(RoutingSession, 'after_commit')
+        def committed(db_session):
+            if db_session.info.pop('wrote', False) and has_request_context():
+                session['_primary_until'] = time.time() + app.config['REPLICA_READ_AFTER_WRITE_SECONDS']
+
+        @event.listens_for(RoutingSession, 'after_rollback')
+        def rolled_back(db_session):
+            db_session.info.pop('wrote', None)
+
+        @app.teardown_request
+        def replica_failed(error):
+            # A replica that fails mid-request is taken out of rotation; the
+            # request itself fails and the next one goes elsewhere.
+            if isinstance(error, DBAPIError) and g.get('db_route'):
+                router.mark_down(app, g.db_route)
@@ -0,0 +1,169 @@
+#----------Imports---------- #
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from models import db, Venue, Artist, Show
+import counters
+
+
+#----------Batch Scheduling---------- #
+# Books many shows at once. An entry conflicts when its venue or its artist
+# already has a show overlapping [start_time, start_time + duration), either
+# in the database or earlier in the same batch; every other entry is added in
+# the caller's transaction.
+#
+# Existing bookings come from one query of OR'd (venue_id, start_time range)
+# and (artist_id, start_time range) terms, each answered by the matching
+# (id, start_time) index. The ranges look back by the longest allowed
+# duration so a long show that started earlier is still found. The venues and
+# artists involved are locked first (SELECT ... FOR UPDATE on PostgreSQL), so
+# two batches for the same venue or artist cannot both book the same slot.
+
+def parse_entry(data, default_duration, max_duration):
+    # Returns (entry, errors) for one JSON object of the batch.
+    if not isinstance(data, dict):
+        return None, {"entry": ['Must be an object.']}
+    errors = dict()
+    entry = dict()
+    for name in ('artist_id', 'venue_id'):
+        try:
+            entry[name] = int(data[name])
+        except KeyError:
+            errors[name] = ['This field is required.']
+        except (TypeError, ValueError):
+            errors[name] = ['Must be an integer id.']
+    try:
+        start_time = datetime.fromisoformat(str(data['start_time']))
+        if start_time.tzinfo is not None:
+            # Show times are stored as naive local times.
+            start_time = start_time.astimezone().replace(tzinfo=None)
+        entry['start_time'] = start_time
+    except KeyError:
+        errors['start_time'] = ['This field is required.']
+    except ValueError:
+        errors['start_time'] = ['Must be an ISO 8601 date and time.']
+    duration = data.get('duration_minutes', default_duration)
+    if isinstance(duration, int) and not isinstance(duration, bool) and 0 < duration <= max_duration:
+        entry['duration_minutes'] = duration
+    else:
+        errors['duration_minutes'] = [f'Must be a whole number of minutes from 1 to {max_duration}.']
+    if errors:
+        return None, errors
+    entry['end_time'] = entry['start_time'] + timedelta(minutes=entry['duration_minutes'])
+    return entry, None
+
+
+def lock_existing(model, ids):
+    if not ids:
+        return set()
+    query = (
+        db.session.query(model.id)
+        .filter(model.id.in_(ids))
+        .order_by(model.id)
+        .with_for_update()
+    )
+    return {row.id for row in query}
+
+
+def booked(entries, max_duration):
+    # Existing shows that may overlap any entry, indexed by venue and artist.
+    lookback = timedelta(minutes=max_duration)
+    terms = list()
+    for entry in entries:
+        window = and_(
+            Show.start_time > entry['start_time'] - lookback,
+            Show.start_time < entry['end_time'],
+        )
+        terms.append(and_(Show.venue_id == entry['venue_id'], window))
+        terms.append(and_(Show.artist_id == entry['artist_id'], window))
+    venues = defaultdict(list)
+    artists = defaultdict(list)
+    if not terms:
+        return venues, artists
+    rows = db.session.query(
+        Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.duration_minutes
+    ).filter(or_(*terms))
+    for row in rows:
+        booking = {
+            "show_id": row.id,
+            "start_time": row.start_time,
+            "end_time": row.start_time + timedelta(minutes=row.duration_minutes),
+        }
+        venues[row.venue_id].append(booking)
+        artists[row.artist_id].append(booking)
+    return venues, artists
+
+
+def overlapping(bookings, entry, on):
+    return [
+        dict(booking, on=on)
+        for booking in bookings
+        if booking['start_time'] < entry['end_time'] and entry['start_time'] < booking['end_time']
+    ]
+
+
+def schedule(data, default_duration=120, max_duration=720):
+    # Returns one result per entry, in order: "scheduled" with the new show
+    # id, "conflict" with the overlapping bookings, or "invalid" with errors.
+    # The caller commits.
+    results = [None] * len(data)
+    entries = list()
+    for index, item in enumerate(data):
+        entry, errors = parse_entry(item, default_duration, max_duration)
+        if errors:
+            results[index] = {"index": index, "status": 'invalid', "errors": errors}
+        else:
+            entries.append((index, entry))
+
+    venue_ids = lock_existing(Venue, {entry['venue_id'] for _, entry in entries})
+    artist_ids = lock_existing(Artist, {entry['artist_id'] for _, entry in entries})
+    known = list()
+    for index, entry in entries:
+        errors = dict()
+        if entry['venue_id'] not in venue_ids:
+            errors['venue_id'] = ['No such venue.']
+        if entry['artist_id'] not in artist_ids:
+            errors['artist_id'] = ['No such artist.']
+        if errors:
+            results[index] = {"index": index, "status": 'invalid', "errors": errors}
+        else:
+            known.append((index, entry))
+
+    venues, artists = booked([entry for _, entry in known], max_duration)
+    shows = list()
+    for index, entry in known:
+        conflicts = overlapping(venues[entry['venue_id']], entry, 'venue') + \
+            overlapping(artists[entry['artist_id']], entry, 'artist')
+        if conflicts:
+            results[index] = {"index": index, "status": 'conflict', "conflicts": conflicts}
+            continue
+        show = Show(
+            venue_id=entry['venue_id'],
+            artist_id=entry['artist_id'],
+            start_time=entry['start_time'],
+            duration_minutes=entry['duration_minutes'],
+        )
+        shows.append((index, show))
+        # Later entries of the batch must not overlap this one either.
+        booking = {
+            "batch_index": index,
+            "start_time": entry['start_time'],
+            "end_time": entry['end_time'],
+        }
+        venues[entry['venue_id']].append(booking)
+        artists[entry['artist_id']].append(booking)
+
+    db.session.add_all(show for _, show in shows)
+    db.session.flush()
+    for index, show in shows:
+        results[index] = {
+            "index": index,
+            "status": 'scheduled',
+            "id": show.id,
+            "venue_id": show.venue_id,
+            "artist_id": show.artist_id,
+        }
+    counters.refresh(Venue, {show.venue_id for _, show in shows})
+    counters.refresh(Artist, {show.artist_id for _, show in shows})
+    return results
@@ -0,0 +1,144 @@
+#----------Imports---------- #
+
+import threading
+from sqlalchemy import func
+from models import db, Venue, Artist
+from cache import catalog_version, on_catalog_commit
+from queries import escape_like, on_postgresql
+
+
+#----------In-memory Trigram Index---------- #
+# PostgreSQL answers name searches from the pg_trgm GIN indexes declared in
+# models.py. Other backends (SQLite test runs) use this index instead, built
+# lazily from the table at the current catalog data version. Names committed
+# in this process are patched in after the commit; a version moved on by any
+# other process (another worker, the import CLI) rebuilds the index.
+
+def trigrams(text):
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+
+    def __init__(self, version=None):
+        self.version = version
+        self.names = dict()
+        self.postings = dict()
+
+    def add(self, row_id, name):
+        self.remove(row_id)
+        name = name or ''
+        self.names[row_id] = name
+        for gram in trigrams(name):
+            self.postings.setdefault(gram, set()).add(row_id)
+
+    def remove(self, row_id):
+        name = self.names.pop(row_id, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(row_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def candidates(self, term):
+        # Only trigrams fully inside the term are guaranteed to appear in a
+        # name containing it; padded edge grams are not.
+        lowered = term.lower()
+        grams = {lowered[i:i + 3] for i in range(len(lowered) - 2)}
+        if not grams:
+            return self.names.keys()
+        postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+        return set.intersection(*postings)
+
+    def search(self, term, limit):
+        lowered = term.lower()
+        term_grams = trigrams(term)
+        matches = list()
+        for row_id in self.candidates(term):
+            name = self.names[row_id]
+            if lowered not in name.lower():
+                continue
+            name_grams = trigrams(name)
+            score = len(term_grams & name_grams) / len(term_grams | name_grams)
+            matches.append((-score, name, row_id))
+        matches.sort()
+        data = [{"id": row_id, "name": name, "score": -score}
+                for score, name, row_id in matches[:limit]]
+        return results(data, len(matches))
+
+
+_lock = threading.Lock()
+_indexes = dict()
+
+
+def memory_index(model):
+    version = catalog_version()
+    with _lock:
+        index = _indexes.get(model)
+        if index is not None and index.version == version:
+            return index
+    index = TrigramIndex(version)
+    for row in db.session.query(model.id, model.name):
+        index.add(row.id, row.name)
+    with _lock:
+        _indexes[model] = index
+    return index
+
+
+def reset():
+    with _lock:
+        _indexes.clear()
+
+
+@on_catalog_commit
+def _committed(changes, previous, current):
+    with _lock:
+        for model, index in list(_indexes.items()):
+            if index.version != previous:
+                del _indexes[model]
+                continue
+            for change in changes:
+                if change.model is not model:
+                    continue
+                if change.deleted:
+                    index.remove(change.id)
+                elif 'name' in change.values:
+                    index.add(change.id, change.values['name'])
+            index.version = current
+
+
+#----------Search---------- #
+
+def results(data, total):
+    return {"count": total, "data": data, "has_more": total > len(data)}
+
+
+def search_names(model, term, limit=50):
+    # Case-insensitive partial match on name, best trigram similarity first.
+    # Returns the first `limit` matches already fetched, plus the total number
+    # of matches counted in the same query.
+    term = term.strip()
+    if not on_postgresql():
+        index = memory_index(model)
+        with _lock:
+            return index.search(term, limit)
+
+    score = func.similarity(model.name, term)
+    rows = (
+        db.session.query(
+            model.id,
+            model.name,
+            score.label('score'),
+            func.count().over().label('total'),
+        )
+        .filter(model.name.ilike(f'%{escape_like(term)}%', escape='!'))
+        .order_by(score.desc(), model.name)
+        .limit(limit)
+        .all()
+    )
+    data = [{"id": row.id, "name": row.name, "score": row.score} for row in rows]
+    return results(data, rows[0].total if rows else 0)
@@ -0,0 +1,183 @@
+#----------Imports---------- #
+
+import random
+from datetime import datetime, timedelta
+from models import db, Venue, Artist, Show
+import counters
+import matchmaking
+import search
+
+
+#----------Sample Data---------- #
+
+AREAS = [
+    ('San Francisco', 'CA'),
+    ('Los Angeles', 'CA'),
+    ('New York', 'NY'),
+    ('Brooklyn', 'NY'),
+    ('Austin', 'TX'),
+    ('Houston', 'TX'),
+    ('Chicago', 'IL'),
+    ('Seattle', 'WA'),
+    ('Portland', 'OR'),
+    ('Nashville', 'TN'),
+    ('New Orleans', 'LA'),
+    ('Denver', 'CO'),
+]
+
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other',
+]
+
+WORDS = [
+    'Musical', 'Hop', 'Park', 'Square', 'Live', 'Coffee', 'Dueling', 'Pianos',
+    'Wild', 'Sax', 'Band', 'Guns', 'Petals', 'Blue', 'Moon', 'Velvet',
+    'Echo', 'Lounge', 'Hall', 'Garden', 'Room', 'Club', 'Tavern', 'Social',
+]
+
+
+#----------Generators---------- #
+
+def _name(rng):
+    return ' '.join(rng.sample(WORDS, rng.randint(2, 4)))
+
+
+def _venue(rng, i):
+    city, state = rng.choice(AREAS)
+    return {
+        "name": f'The {_name(rng)} {i}',
+        "city": city,
+        "state": state,
+        "address": f'{rng.randint(1, 9999)} Main Street',
+        "phone": f'{rng.randint(200, 999)}-555-{rng.randint(1000, 9999)}',
+        "image_link": f'https://images.example.com/venues/{i}.jpg',
+        "facebook_link": f'https://www.facebook.com/venue{i}',
+        "website": f'https://venue{i}.example.com',
+        "seeking_talent": rng.random() < 0.5,
+        "seeking_description": 'Looking for local acts to play weekends.',
+        "genres": rng.sample(GENRES, rng.randint(1, 4)),
+    }
+
+
+def _artist(rng, i):
+    city, state = rng.choice(AREAS)
+    return {
+        "name": f'{_name(rng)} {i}',
+        "city": city,
+        "state": state,
+        "phone": f'{rng.randint(200, 999)}-555-{rng.randint(1000, 9999)}',
+        "image_link": f'https://images.example.com/artists/{i}.jpg',
+        "facebook_link": f'https://www.facebook.com/artist{i}',
+        "website": f'https://artist{i}.example.com',
+        "seeking_venue": rng.random() < 0.5,
+        "seeking_description": 'Looking for shows in the area.',
+        "genres": rng.sample(GENRES, rng.randint(1, 3)),
+    }
+
+
+def _chunks(rows, size):
+    chunk = list()
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = list()
+    if chunk:
+        yield chunk
+
+
+def scaled(shows):
+    # Venue and artist counts that keep shows per venue and per artist
+    # realistic as the total grows from 1k to 10M.
+    return max(10, shows // 100), max(20, shows // 50)
+
+
+def seed(venues=100, artists=200, shows=1000, chunk_size=5000, rng_seed=0,
+         span_days=3 * 365, on_progress=None):
+    # Inserts synthetic rows in executemany chunks. Shows are spread over
+    # span_days centred on today so roughly half are upcoming. Memory stays
+    # flat however many shows are requested; only the ids are held.
+    rng = random.Random(rng_seed)
+    first_venue = (db.session.query(db.func.max(Venue.id)).scalar() or 0) + 1
+    first_artist = (db.session.query(db.func.max(Artist.id)).scalar() or 0) + 1
+
+    for chunk in _chunks((_venue(rng, first_venue + i) for i in range(venues)), chunk_size):
+        db.session.execute(Venue.__table__.insert(), chunk)
+    for chunk in _chunks((_artist(rng, first_artist + i) for i in range(artists)), chunk_size):
+        db.session.execute(Artist.__table__.insert(), chunk)
+    db.session.commit()
+    search.reset()
+
+    venue_ids = [row.id for row in db.session.query(Venue.id)]
+    artist_ids = [row.id for row in db.session.query(Artist.id)]
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) \
+        - timedelta(days=span_days // 2)
+    span_hours = span_days * 24
+
+    def show_rows():
+        for _ in range(shows):
+            yield {
+                "venue_id": rng.choice(venue_ids),
+                "artist_id": rng.choice(artist_ids),
+                "start_time": start + timedelta(hours=rng.randrange(span_hours)),
+            }
+
+    inserted = 0
+    for chunk in _chunks(show_rows(), chunk_size):
+        db.session.execute(Show.__table__.insert(), chunk)
+        db.session.commit()
+        inserted += len(chunk)
+        if on_progress is not None:
+            on_progress(inserted)
+    counters.refresh_all()
+    db.session.commit()
+    matchmaking.reset()
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import time
+
+    parser = argparse.ArgumentParser(description='Populate the database with synthetic data.')
+    parser.add_argument('--scale', type=int,
+                        help='number of shows (1000 to 10000000); venues and artists '
+                             'are sized to match unless given')
+    parser.add_argument('--venues', type=int)
+    parser.add_argument('--artists', type=int)
+    parser.add_argument('--shows', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--database-url',
+                        help='e.g. sqlite:///bench.db or postgresql://localhost/fyyur_bench '
+                             '(defaults to DATABASE_URL)')
+    parser.add_argument('--create', action='store_true',
+                        help='create missing tables first (for a fresh database)')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    from app import app, page_cache
+
+    shows = args.shows if args.shows is not None else args.scale or 1000
+    default_venues, default_artists = scaled(shows) if args.scale else (100, 200)
+    venues = args.venues if args.venues is not None else default_venues
+    artists = args.artists if args.artists is not None else default_artists
+
+    started = time.perf_counter()
+
+    def progress(count):
+        print(f'\r{count}/{shows} shows ({time.perf_counter() - started:.0f}s)', end='', flush=True)
+
+    with app.app_context():
+        if args.create:
+            db.create_all()
+        seed(venues=venues, artists=artists, shows=shows, chunk_size=args.chunk_size,
+             rng_seed=args.seed, on_progress=progress)
+    # Running servers retire their cached pages and match rankings.
+    page_cache.bump_version()
+    print(f'\n{venues} venues, {artists} artists and {shows} shows added '
+          f'in {time.perf_counter() - started:.1f}s.')
@@ -0,0 +1,191 @@
+#----------Imports---------- #
+
+import heapq
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+#----------Statement Stats---------- #
+# Every statement on every engine (primary and replicas) is timed from the
+# engine events and charged to the current request's RequestStats, which
+# parallel.py hands to its worker threads as well. Responses carry the totals
+# in a Server-Timing header; the slowest statements' SQL is added only in
+# debug mode or with SERVER_TIMING_SQL, as it reveals the schema. Statements
+# slower than SLOW_QUERY_MS go to the "fyyur.sql" logger as JSON. Streamed
+# responses (exports) run most of their queries after the headers are sent,
+# so only the setup queries count there.
+
+slow_log = logging.getLogger('fyyur.sql')
+
+
+class RequestStats:
+
+    def __init__(self, keep=3):
+        self.lock = threading.Lock()
+        self.keep = keep
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = list()
+
+    def record(self, statement, seconds):
+        with self.lock:
+            self.count += 1
+            self.seconds += seconds
+            entry = (seconds, statement)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def top(self):
+        with self.lock:
+            return sorted(self.slowest, reverse=True)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+_watchers = list()
+_watchers_lock = threading.Lock()
+
+
+def current():
+    if has_app_context():
+        return g.get('sql_stats')
+    return None
+
+
+@contextmanager
+def assert_max_queries(limit):
+    # For tests and scripts: fails when the block runs more than `limit`
+    # statements, on any thread.
+    stats = RequestStats()
+    with _watchers_lock:
+        _watchers.append(stats)
+    try:
+        yield stats
+    finally:
+        with _watchers_lock:
+            _watchers.remove(stats)
+    if stats.count > limit:
+        raise QueryBudgetExceeded(
+            f'{stats.count} queries, budget {limit}; slowest: '
+            + '; '.join(statement for _, statement in stats.top())
+        )
+
+
+def query_budget(limit):
+    # Declares how many statements a view may run; checked after the request.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.query_budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+#----------Setup---------- #
+
+def server_timing(stats, elapsed, statements=False):
+    def quoted(text):
+        return '"' + ' '.join(text.split())[:80].replace('\\', '').replace('"', "'") + '"'
+
+    entries = [
+        f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"',
+        f'app;dur={elapsed * 1000:.1f}',
+    ]
+    if not statements:
+        return ', '.join(entries)
+    for rank, (seconds, statement) in enumerate(stats.top(), 1):
+        entries.append(f'sql-{rank};dur={seconds * 1000:.1f};desc={quoted(statement)}')
+    return ', '.join(entries)
+
+
+def instrument(app):
+    keep = app.config['SLOWEST_STATEMENTS']
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def started(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'handle_error')
+    def failed(context):
+        # A statement that raised never reaches after_cursor_execute.
+        if context.connection is None:
+            return
+        started_at = context.connection.info.get('query_started')
+        if started_at:
+            started_at.pop()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def finished(connection, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - connection.info['query_started'].pop()
+        stats = current()
+        if stats is not None:
+            stats.record(statement, seconds)
+        if _watchers:
+            with _watchers_lock:
+                for watcher in _watchers:
+                    watcher.record(statement, seconds)
+        if seconds * 1000 >= app.config['SLOW_QUERY_MS']:
+            slow_log.warning('slow query', extra={"sql": {
+                "duration_ms": round(seconds * 1000, 3),
+                "statement": ' '.join(statement.split()),
+                "executemany": executemany,
+                "database": connection.engine.url.database,
+                "request": f'{request.method} {request.path}' if has_request_context() else None,
+            }})
+
+    @app.before_request
+    def start_request():
+        g.sql_stats = RequestStats(keep)
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def report(response):
+        stats = g.get('sql_stats')
+        if stats is None:
+            return response
+        if app.config['SERVER_TIMING']:
+            response.headers['Server-Timing'] = server_timing(
+                stats, time.perf_counter() - g.request_started,
+                statements=app.debug or app.config['SERVER_TIMING_SQL'])
+        budget = g.get('query_budget')
+        if budget is not None and stats.count > budget:
+            message = (f'{request.method} {request.path} ran {stats.count} queries, '
+                       f'budget {budget}')
+            if app.config['QUERY_BUDGET_ENFORCE']:
+                raise QueryBudgetExceeded(message)
+            slow_log.warning('query budget exceeded', extra={"sql": {
+                "request": f'{request.method} {request.path}',
+                "queries": stats.count,
+                "budget": budget,
+                "db_ms": round(stats.seconds * 1000, 3),
+                "slowest": [' '.join(statement.split()) for _, statement in stats.top()],
+            }})
+        return response
+
+
+#----------Logging---------- #
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line: time, level, message and the record's "sql"
+    # fields.
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, 'sql', {}))
+        return json.dumps(entry, default=str)
@@ -0,0 +1,62 @@
+#----------Imports---------- #
+# The app reads its configuration at import time, so the test database has
+# to be chosen before anything imports app.py.
+
+import os
+import sys
+import tempfile
+import pytest
+
+DATABASE_DIR = tempfile.mkdtemp(prefix='fyyur-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(DATABASE_DIR, "fyyur.db")}'
+os.environ['CACHE_VERSION_FILE'] = os.path.join(DATABASE_DIR, 'data-version')
+os.environ.pop('DATABASE_REPLICA_URLS', None)
+os.environ.pop('METRICS_DIR', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as fyyur_app, detail_cache, page_cache, fragment_cache
+from models import db
+import matchmaking
+import search
+import seed
+
+
+#----------Fixtures---------- #
+
+def clear_caches():
+    page_cache.bump_version()
+    detail_cache.clear()
+    fragment_cache.clear()
+
+
+@pytest.fixture
+def app():
+    config = dict(fyyur_app.config)
+    fyyur_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, QUERY_BUDGET_ENFORCE=True)
+    with fyyur_app.app_context():
+        db.create_all()
+        yield fyyur_app
+        db.session.remove()
+        db.drop_all()
+    fyyur_app.config.clear()
+    fyyur_app.config.update(config)
+    clear_caches()
+    matchmaking.reset()
+    search.reset()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded(app):
+    # seeded(shows) adds that many shows, with venues and artists scaled to
+    # match, and empties the caches so the next request hits the database.
+    def add(shows, **kwargs):
+        venues, artists = seed.scaled(shows)
+        seed.seed(venues=kwargs.pop('venues', venues), artists=kwargs.pop('artists', artists),
+                  shows=shows, **kwargs)
+        clear_caches()
+    return add
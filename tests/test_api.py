@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from models import db, Venue, Artist, Show
+
+
+def test_included_shows_are_capped_per_parent(client, app):
+    app.config['API_SHOWS_PER_PARENT'] = 2
+    db.session.add_all([Venue(name='Hall'), Venue(name='Club'), Venue(name='Empty'), Artist(name='Band')])
+    db.session.flush()
+    now = datetime.now().replace(microsecond=0)
+    db.session.add_all(
+        [Show(venue_id=1, artist_id=1, start_time=now + timedelta(days=days)) for days in (4, 1, 3, 2, -5)]
+        + [Show(venue_id=2, artist_id=1, start_time=now + timedelta(days=1))]
+    )
+    db.session.commit()
+
+    response = client.get('/api/v1/venues?include=shows&fields=name')
+    assert response.status_code == 200
+    hall, club, empty = response.get_json()['data']
+
+    assert hall['shows_total'] == 4
+    assert [show['start_time'] for show in hall['shows']] == [
+        (now + timedelta(days=days)).isoformat() for days in (1, 2)
+    ]
+    assert hall['shows'][0]['artist_name'] == 'Band'
+    assert (club['shows_total'], len(club['shows'])) == (1, 1)
+    assert (empty['shows_total'], empty['shows']) == (0, [])
+
+    artist = client.get('/api/v1/artists/1?include=shows').get_json()['data']
+    assert artist['shows_total'] == 5
+    assert [show['venue_name'] for show in artist['shows']] == ['Hall', 'Club']
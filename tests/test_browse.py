@@ -0,0 +1,52 @@
+def test_pages_past_the_end_keep_the_total_and_facets(client, seeded):
+    seeded(100, venues=10)
+    first = client.get('/api/v1/venues/browse?limit=5&page=1').get_json()
+    past_end = client.get('/api/v1/venues/browse?limit=5&page=3').get_json()
+    assert len(first['data']) == 5
+    assert past_end['data'] == []
+    assert past_end['count'] == first['count'] == 10
+    assert past_end['facets'] == first['facets']
+    assert sum(first['facets']['states'].values()) == 10
+
+
+def test_browse_is_one_query_even_with_no_matches(client, seeded):
+    from sqlstats import assert_max_queries
+    seeded(100, venues=10)
+    with assert_max_queries(1):
+        body = client.get('/api/v1/venues/browse?city=Nowhere').get_json()
+    assert body['count'] == 0 and body['data'] == []
+    assert body['facets'] == {"genres": {}, "states": {}, "cities": {}, "seeking": 0}
+
+
+def test_genre_filters_match_whole_genres_only(client, app):
+    from models import db, Venue
+    db.session.add_all([
+        Venue(name='Soul Bar', genres=['R&B']),
+        Venue(name='Percent', genres=['100%', 'Jazz']),
+        Venue(name='Quoted', genres=['Say "Hi"']),
+        Venue(name='Café', genres=['Chanson française']),
+    ])
+    db.session.commit()
+
+    def names(genres):
+        body = client.get('/api/v1/venues/browse', query_string=[('genre', genre) for genre in genres])
+        return sorted(item['name'] for item in body.get_json()['data'])
+
+    assert names(['R&B']) == ['Soul Bar']
+    assert names(['R_B']) == []
+    assert names(['%']) == []
+    assert names(['100%']) == ['Percent']
+    assert names(['Say "Hi"']) == ['Quoted']
+    assert names(['Hi']) == []
+    assert names(['Chanson française']) == ['Café']
+
+
+def test_genre_filters_follow_the_routed_bind(app, monkeypatch):
+    # A PostgreSQL replica behind a SQLite primary still gets array operators.
+    from types import SimpleNamespace
+    from sqlalchemy.dialects import postgresql
+    from models import db, Venue
+    from queries import has_genres
+    monkeypatch.setattr(db.session, 'get_bind',
+                        lambda *args, **kwargs: SimpleNamespace(dialect=postgresql.dialect()))
+    assert '@>' in str(has_genres(Venue.genres, ['Jazz']).compile(dialect=postgresql.dialect()))
@@ -0,0 +1,67 @@
+from datetime import datetime
+from models import db, Venue, Artist, Show
+
+
+def add_shows(*shows):
+    db.session.add(Venue(name='Hall', city='Austin', state='TX'))
+    db.session.flush()
+    for artist_name, start_time, duration in shows:
+        artist = Artist(name=artist_name)
+        db.session.add(artist)
+        db.session.flush()
+        db.session.add(Show(venue_id=1, artist_id=artist.id, start_time=start_time,
+                            duration_minutes=duration))
+    db.session.commit()
+
+
+def listed(client, query):
+    response = client.get(f'/shows?{query}')
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    return [name for name in ('Before', 'First', 'Last', 'After') if f'>{name}<' in text]
+
+
+def test_show_range_bounds(client, app):
+    add_shows(
+        ('Before', datetime(2030, 5, 1, 23, 59), 120),
+        ('First', datetime(2030, 5, 2, 0, 0), 120),
+        ('Last', datetime(2030, 5, 3, 20, 0), 120),
+        ('After', datetime(2030, 5, 4, 0, 0), 120),
+    )
+    # A bare `to` date includes that whole day; `from` is inclusive.
+    assert listed(client, 'from=2030-05-02&to=2030-05-03') == ['First', 'Last']
+    assert listed(client, 'from=2030-05-02&to=2030-05-03T20:00') == ['First']
+    assert listed(client, 'from=2030-05-01T23:59&to=2030-05-04T00:00') == ['Before', 'First', 'Last']
+    assert listed(client, 'from=2030-05-03&city=Austin') == ['Last', 'After']
+    assert listed(client, 'from=2030-05-03&city=Dallas') == []
+    assert listed(client, 'from=2030-05-05') == []
+
+
+def test_bad_ranges_are_rejected(client, app):
+    add_shows(('First', datetime(2030, 5, 2, 20, 0), 120))
+    for query in ('from=tuesday', 'to=2030-13-01', 'from=2030-05-03&to=2030-05-02T12:00',
+                  'from=2030-05-02T12:00&to=2030-05-02T12:00'):
+        assert client.get(f'/shows?{query}').status_code == 400, query
+    assert client.get('/venues/1/availability?from=2030/05/02').status_code == 400
+    assert client.get('/venues/2/availability').status_code == 404
+
+
+def test_overlapping_bookings_mark_days_unavailable(client, app):
+    add_shows(
+        ('Before', datetime(2030, 5, 1, 23, 0), 120),
+        ('Last', datetime(2030, 5, 4, 20, 0), 60),
+        ('After', datetime(2030, 5, 6, 0, 0), 60),
+    )
+    response = client.get('/venues/1/availability?from=2030-05-02&days=4')
+    assert response.status_code == 200
+    days = response.get_json()['days']
+
+    assert [(day['date'], day['available']) for day in days] == [
+        ('2030-05-02', False),
+        ('2030-05-03', True),
+        ('2030-05-04', False),
+        ('2030-05-05', True),
+    ]
+    late, = days[0]['bookings']
+    assert (late['artist_name'], late['start_time'], late['end_time']) == \
+        ('Before', '2030-05-01T23:00:00', '2030-05-02T01:00:00')
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
+import counters
+import importer
+from models import db, Venue, Artist, Show
+
+
+def add_pair():
+    db.session.add_all([Venue(name='Hall'), Venue(name='Club'), Artist(name='Band')])
+    db.session.commit()
+
+
+def counts(model, row_id):
+    db.session.expire_all()
+    row = model.query.get(row_id)
+    return row.upcoming_shows_count, row.past_shows_count, row.next_show_at
+
+
+def test_created_and_scheduled_shows_update_counters(client, app):
+    add_pair()
+    start = datetime.now().replace(microsecond=0) + timedelta(days=2)
+
+    response = client.post('/shows/create', data={
+        "artist_id": '1', "venue_id": '1', "start_time": start.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    assert response.status_code == 200
+    assert counts(Venue, 1) == (1, 0, start)
+    assert counts(Artist, 1) == (1, 0, start)
+
+    sooner = start - timedelta(days=1)
+    response = client.post('/shows/schedule', json={"shows": [
+        {"venue_id": 2, "artist_id": 1, "start_time": sooner.isoformat()},
+    ]})
+    assert response.status_code == 201
+    assert counts(Venue, 2) == (1, 0, sooner)
+    assert counts(Artist, 1) == (2, 0, sooner)
+
+
+def test_imported_shows_update_counters(app):
+    add_pair()
+    start = datetime.now().replace(microsecond=0) - timedelta(days=1)
+    rows = [(1, {"artist_id": 1, "venue_id": 1, "start_time": start.strftime('%Y-%m-%d %H:%M:%S')})]
+    assert importer.import_rows('shows', rows)['inserted'] == 1
+    assert counts(Venue, 1) == (0, 1, None)
+    assert counts(Artist, 1) == (0, 1, None)
+
+
+def test_refresh_due_moves_started_shows_to_past(app):
+    add_pair()
+    now = datetime.now().replace(microsecond=0)
+    first, second = now + timedelta(hours=1), now + timedelta(days=1)
+    db.session.add_all([
+        Show(venue_id=1, artist_id=1, start_time=first),
+        Show(venue_id=2, artist_id=1, start_time=second),
+    ])
+    db.session.flush()
+    counters.refresh_all(now)
+    db.session.commit()
+    assert counts(Artist, 1) == (2, 0, first)
+
+    assert counters.refresh_due(now) == 0
+    # Two hours later only the first venue and the artist are due.
+    assert counters.refresh_due(now + timedelta(hours=2)) == 2
+    db.session.commit()
+    assert counts(Venue, 1) == (0, 1, None)
+    assert counts(Venue, 2) == (1, 0, second)
+    assert counts(Artist, 1) == (1, 1, second)
+
+
+def test_deleting_a_venue_takes_its_shows(client, app):
+    add_pair()
+    start = datetime.now().replace(microsecond=0) + timedelta(days=2)
+    db.session.add_all([
+        Show(venue_id=1, artist_id=1, start_time=start),
+        Show(venue_id=2, artist_id=1, start_time=start + timedelta(days=1)),
+    ])
+    db.session.flush()
+    counters.refresh_all()
+    db.session.commit()
+
+    assert client.delete('/venues/1').status_code == 200
+    assert Venue.query.get(1) is None
+    assert [show.venue_id for show in Show.query] == [2]
+    assert counts(Artist, 1) == (1, 0, start + timedelta(days=1))
+
+    assert client.delete('/artists/1').status_code == 200
+    assert Show.query.count() == 0
+    assert counts(Venue, 2) == (0, 0, None)
+    assert client.delete('/artists/1').status_code == 404
+
+
+def test_failed_delete_is_an_error(client, app, monkeypatch):
+    add_pair()
+    db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=1)))
+    db.session.commit()
+
+    def fail(*args, **kwargs):
+        raise SQLAlchemyError('refresh failed')
+
+    monkeypatch.setattr(counters, 'refresh', fail)
+    assert client.delete('/venues/1').status_code == 500
+    assert Venue.query.get(1) is not None
+    assert Show.query.count() == 1
@@ -0,0 +1,13 @@
+from dbpool import TimedQueuePool, engine_options
+
+
+def test_statement_timeout_applies_to_postgres_urls(app):
+    app.config['DB_STATEMENT_TIMEOUT_MS'] = 5000
+    for url in ('postgres://fyyur@localhost/fyyur', 'postgresql+psycopg2://fyyur@localhost/fyyur'):
+        options = engine_options(url, app.config)
+        assert options['poolclass'] is TimedQueuePool
+        assert options['connect_args'] == {"options": '-c statement_timeout=5000'}
+
+
+def test_sqlite_binds_keep_their_defaults(app):
+    assert engine_options('sqlite:///replica.db', app.config) == dict()
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from datetime import datetime
+import exporter
+from models import db, Venue, Artist, Show
+
+
+def add_catalog():
+    db.session.add_all([
+        Venue(name='Hall, East', city='Austin', state='TX', genres=['Jazz', 'Blues']),
+        Venue(name='Club "B"', city='Dallas', state='TX', genres=['Pop']),
+        Artist(name='Band', city='Austin', state='TX', genres=['Jazz'], seeking_venue=True),
+    ])
+    db.session.flush()
+    db.session.add_all([
+        Show(venue_id=1, artist_id=1, start_time=datetime(2030, 5, 1, 20, 0)),
+        Show(venue_id=2, artist_id=1, start_time=datetime(2030, 5, 2, 21, 30), duration_minutes=90),
+        Show(venue_id=1, artist_id=1, start_time=datetime(2030, 5, 3, 19, 0)),
+    ])
+    db.session.commit()
+
+
+def test_csv_round_trips_in_chunks(app):
+    add_catalog()
+    chunks = list(exporter.generate('venues', 'csv', chunk_size=1))
+    assert len(chunks) == 3
+
+    rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+    assert [(row['id'], row['name'], row['genres']) for row in rows] == [
+        ('1', 'Hall, East', 'Jazz;Blues'),
+        ('2', 'Club "B"', 'Pop'),
+    ]
+    assert set(rows[0]) == {column.name for column in Venue.__table__.columns}
+
+
+def test_jsonl_round_trips_through_the_route(client, app):
+    add_catalog()
+    response = client.get('/export/shows.jsonl')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=shows.jsonl'
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows == [
+        {"id": 1, "start_time": '2030-05-01T20:00:00', "duration_minutes": 120,
+         "venue_id": 1, "venue_name": 'Hall, East', "artist_id": 1, "artist_name": 'Band'},
+        {"id": 2, "start_time": '2030-05-02T21:30:00', "duration_minutes": 90,
+         "venue_id": 2, "venue_name": 'Club "B"', "artist_id": 1, "artist_name": 'Band'},
+        {"id": 3, "start_time": '2030-05-03T19:00:00', "duration_minutes": 120,
+         "venue_id": 1, "venue_name": 'Hall, East', "artist_id": 1, "artist_name": 'Band'},
+    ]
+
+    artist, = [json.loads(line) for line in ''.join(exporter.generate('artists', 'ndjson')).splitlines()]
+    assert artist['genres'] == ['Jazz'] and artist['seeking_venue'] is True
@@ -0,0 +1,43 @@
+from itertools import count
+from jinja2 import DictLoader
+from models import db, Venue
+from app import page_cache
+
+TEMPLATES = {
+    "tiles.html": "{% cache 'tile', item %}{{ tick() }}{% endcache %}\n"
+                  "{% cache 'tile', item %}{{ tick() }}{% endcache %}",
+    "other.html": "{% cache 'tile', item %}{{ tick() }}{% endcache %}",
+}
+
+
+def renderer(app):
+    # Each render gets its own app context, as each request would.
+    env = app.jinja_env.overlay(loader=DictLoader(TEMPLATES))
+    ticks = count(1)
+
+    def render(name, item):
+        with app.app_context():
+            return env.get_template(name).render(item=item, tick=lambda: next(ticks))
+    return render
+
+
+def test_keys_separate_blocks_templates_and_parts(app):
+    render = renderer(app)
+    assert render('tiles.html', {"id": 1}) == '1\n2'
+    assert render('tiles.html', {"id": 1}) == '1\n2'
+    assert render('other.html', {"id": 1}) == '3'
+    assert render('tiles.html', {"id": 2}) == '4\n5'
+    assert render('tiles.html', {"id": 1, "name": 'Hall'}) == '6\n7'
+    assert render('other.html', {"id": 1}) == '3'
+
+
+def test_data_version_bump_retires_fragments(app):
+    render = renderer(app)
+    assert render('other.html', {"id": 1}) == '1'
+    page_cache.bump_version()
+    assert render('other.html', {"id": 1}) == '2'
+    assert render('other.html', {"id": 1}) == '2'
+
+    db.session.add(Venue(name='Hall'))
+    db.session.commit()
+    assert render('other.html', {"id": 1}) == '3'
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import event
+import importer
+from models import db, Venue, Artist, Show
+
+
+def write_lines(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_valid_rows_go_in_with_one_executemany(app, tmp_path):
+    path = write_lines(tmp_path, 'venues.csv', [
+        'name,city,state,address,genres,seeking_talent,facebook_link,website',
+        'Hall,Austin,TX,1 Main St,Jazz;Blues,yes,https://facebook.com/hall,https://hall.example',
+        'Club,Austin,TX,2 Main St,Pop,no,https://facebook.com/club,https://club.example',
+        'Nowhere,,TX,3 Main St,Pop,no,https://facebook.com/nowhere,https://nowhere.example',
+        'Loft,Dallas,TX,4 Main St,Folk,,https://facebook.com/loft,https://loft.example',
+    ])
+    inserts, errors = list(), list()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT'):
+            inserts.append(executemany)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        stats = importer.import_rows('venues', importer.read_rows(path, 'csv'), batch_size=10,
+                                     on_error=lambda line, row, problems: errors.append((line, problems)))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert stats == {"read": 4, "inserted": 3, "rejected": 1}
+    assert inserts == [True]
+    assert [(line, list(problems)) for line, problems in errors] == [(4, ['city'])]
+    hall = Venue.query.filter_by(name='Hall').one()
+    assert hall.genres == ['Jazz', 'Blues'] and hall.seeking_talent
+    assert not Venue.query.filter_by(name='Loft').one().seeking_talent
+
+
+def test_bad_row_falls_back_to_row_by_row(app):
+    # The second id 1 breaks the executemany; the rows around it still go in.
+    batch = [
+        (1, None, {"id": 1, "name": 'Hall'}),
+        (2, None, {"name": 'Club'}),
+        (3, None, {"id": 1, "name": 'Copy'}),
+    ]
+    inserted, rejected = importer.insert_batch(Venue, batch)
+
+    assert inserted == 2
+    assert [(line, list(errors)) for line, _, errors in rejected] == [(3, ['database'])]
+    assert sorted(name for name, in db.session.query(Venue.name)) == ['Club', 'Hall']
+
+
+def test_show_references_resolve_by_id_or_name(app, tmp_path):
+    db.session.add_all([Venue(name='Hall'), Artist(name='Band'), Artist(name='Duo')])
+    db.session.commit()
+    start = (datetime.now() + timedelta(days=3)).replace(microsecond=0)
+    when = start.strftime('%Y-%m-%d %H:%M:%S')
+    path = write_lines(tmp_path, 'shows.jsonl', [
+        json.dumps({"artist_id": 1, "venue_name": 'Hall', "start_time": when}),
+        json.dumps({"artist_name": 'Duo', "venue_id": '1', "start_time": when}),
+        json.dumps({"artist_name": 'Nobody', "venue_name": 'Hall', "start_time": when}),
+        json.dumps({"artist_id": 2, "start_time": when}),
+        '{not json',
+    ])
+    errors = list()
+    stats = importer.import_rows('shows', importer.read_rows(path, 'jsonl'),
+                                 on_error=lambda line, row, problems: errors.append((line, sorted(problems))))
+
+    assert stats == {"read": 5, "inserted": 2, "rejected": 3}
+    assert sorted(errors) == [(3, ['artist']), (4, ['venue']), (5, ['row'])]
+    assert sorted(db.session.query(Show.artist_id, Show.venue_id)) == [(1, 1), (2, 1)]
+    db.session.expire_all()
+    assert Venue.query.get(1).upcoming_shows_count == 2
+    assert Artist.query.get(2).next_show_at == start
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import load_only
+from cache import make_cache
+from models import db, Venue, Artist, Show
+from sqlstats import assert_max_queries
+
+
+def add_profiles():
+    db.session.add_all([
+        Venue(name='Blue Room', city='Austin', state='TX', genres=['Jazz', 'Blues'], seeking_talent=True),
+        Artist(name='Trio', city='Austin', state='TX', genres=['Jazz', 'Blues'], seeking_venue=True),
+        Artist(name='Quartet', city='Dallas', state='TX', genres=['Jazz', 'Funk'], seeking_venue=True),
+        Artist(name='Crooner', city='Reno', state='NV', genres=['Blues'], seeking_venue=True),
+        Artist(name='Drummer', city='Reno', state='NV', genres=['Metal'], seeking_venue=True),
+        Artist(name='Retired', city='Austin', state='TX', genres=['Jazz'], seeking_venue=False),
+    ])
+    db.session.commit()
+
+
+def names(client, url):
+    return [match['name'] for match in client.get(url).get_json()['data']]
+
+
+def test_matches_rank_by_genres_location_and_history(client, app):
+    add_profiles()
+    db.session.add(Show(venue_id=1, artist_id=3, start_time=datetime.now() - timedelta(days=30)))
+    db.session.commit()
+    body = client.get('/api/v1/venues/1/matches').get_json()
+    assert [match['name'] for match in body['data']] == ['Trio', 'Crooner', 'Quartet']
+    assert body['count'] == 3
+    assert body['data'][0] == {
+        "id": 1, "name": 'Trio', "city": 'Austin', "state": 'TX',
+        "score": 6.0, "shared_genres": ['Blues', 'Jazz'], "past_shows": 0,
+    }
+    assert names(client, '/api/v1/artists/1/matches') == ['Blue Room']
+    assert client.get('/api/v1/venues/9/matches').status_code == 404
+
+
+def test_committed_changes_from_other_processes_retire_rankings(client, app):
+    add_profiles()
+    assert names(client, '/api/v1/venues/1/matches') == ['Trio', 'Quartet', 'Crooner']
+    # Another worker stops Trio seeking; this process only sees the data
+    # version move on.
+    db.session.execute(Artist.__table__.update().where(Artist.id == 1).values(seeking_venue=False))
+    db.session.commit()
+    assert names(client, '/api/v1/venues/1/matches') == ['Trio', 'Quartet', 'Crooner']
+    make_cache(app.config).bump_version()
+    assert names(client, '/api/v1/venues/1/matches') == ['Quartet', 'Crooner']
+
+
+def test_rolled_back_edits_never_show(client, app):
+    add_profiles()
+    artist = Artist.query.get(4)
+    artist.genres = ['Jazz', 'Blues']
+    db.session.flush()
+    db.session.rollback()
+    assert names(client, '/api/v1/venues/1/matches') == ['Trio', 'Quartet', 'Crooner']
+
+
+def ranking(client, limit=2):
+    # (names, count, whether it was served without touching the database)
+    with assert_max_queries(100) as stats:
+        body = client.get(f'/api/v1/venues/1/matches?limit={limit}').get_json()
+    return [match['name'] for match in body['data']], body['count'], stats.count == 0
+
+
+def edit(model, row_id, **values):
+    row = model.query.get(row_id)
+    for key, value in values.items():
+        setattr(row, key, value)
+    db.session.commit()
+
+
+def test_writes_only_retire_rankings_they_can_change(client, app):
+    add_profiles()
+    db.session.add(Venue(name='Red Room', city='Reno', state='NV', genres=['Metal'], seeking_talent=True))
+    db.session.commit()
+    assert ranking(client) == (['Trio', 'Quartet'], 3, False)
+    assert ranking(client) == (['Trio', 'Quartet'], 3, True)
+
+    # Not a candidate before or after, another venue, a show elsewhere.
+    edit(Artist, 4, name='Drums')
+    edit(Venue, 2, genres=['Jazz'])
+    db.session.add(Show(venue_id=2, artist_id=1, start_time=datetime.now() - timedelta(days=3)))
+    db.session.commit()
+    # A candidate below the cut whose score stays below it.
+    edit(Artist, 3, city='Vegas')
+    assert ranking(client) == (['Trio', 'Quartet'], 3, True)
+
+    # A candidate climbing past the cut.
+    edit(Artist, 3, city='Austin', state='TX')
+    assert ranking(client) == (['Trio', 'Crooner'], 3, False)
+    # A newcomer changes the count even when it ranks below the cut.
+    edit(Artist, 4, genres=['Blues', 'Metal'])
+    assert ranking(client) == (['Trio', 'Crooner'], 4, False)
+    # A ranked candidate, the subject itself, and the subject's shows.
+    edit(Artist, 1, name='The Trio')
+    assert ranking(client) == (['The Trio', 'Crooner'], 4, False)
+    edit(Venue, 1, city='Dallas')
+    assert ranking(client) == (['The Trio', 'Quartet'], 4, False)
+    db.session.add(Show(venue_id=1, artist_id=4, start_time=datetime.now() - timedelta(days=3)))
+    db.session.commit()
+    assert ranking(client)[2] is False
+
+
+def test_changes_with_unloaded_columns_retire_rankings(client, app):
+    add_profiles()
+    assert ranking(client)[2] is False
+    artist = Artist.query.options(load_only('name')).get(4)
+    artist.name = 'Drums'
+    db.session.commit()
+    assert ranking(client)[2] is False
+    assert ranking(client)[2] is True
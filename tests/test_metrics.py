@@ -0,0 +1,11 @@
+import re
+
+
+def test_template_renders_are_timed(client, app):
+    assert client.get('/').status_code == 200
+    text = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE fyyur_template_render_seconds histogram' in text
+    count = re.search(r'^fyyur_template_render_seconds_count\{template="pages/home.html"\} (\d+)$',
+                      text, re.M)
+    assert count and int(count.group(1)) >= 1
+    assert re.search(r'^fyyur_http_requests_total\{method="GET",route="/",status="200"\} \d+$', text, re.M)
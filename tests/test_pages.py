@@ -0,0 +1,39 @@
+from cache import make_cache
+from models import db, Venue
+
+
+def add_venue_elsewhere(app, name):
+    # A write made by another worker or a CLI command: this process sees no
+    # ORM events, only the shared data version moving on.
+    db.session.execute(Venue.__table__.insert(), {"name": name, "city": 'Austin', "state": 'TX'})
+    db.session.commit()
+    make_cache(app.config).bump_version()
+
+
+def test_listing_answers_conditional_requests(client, seeded):
+    seeded(100)
+    first = client.get('/venues')
+    assert first.status_code == 200
+    assert first.headers['ETag'] and first.headers['Last-Modified']
+    again = client.get('/venues', headers={"If-None-Match": first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_write_in_another_process_retires_cached_pages(app, client, seeded):
+    seeded(100)
+    first = client.get('/venues')
+    add_venue_elsewhere(app, 'The Elsewhere Lounge')
+    second = client.get('/venues', headers={"If-None-Match": first.headers['ETag']})
+    assert second.status_code == 200
+    assert 'The Elsewhere Lounge' in second.get_data(as_text=True)
+    assert second.headers['ETag'] != first.headers['ETag']
+
+
+def test_detail_pages_follow_writes_from_other_processes(app, client, seeded):
+    seeded(100)
+    assert client.get('/venues/1').status_code == 200
+    db.session.execute(Venue.__table__.update().where(Venue.id == 1).values(name='Renamed Elsewhere'))
+    db.session.commit()
+    assert 'Renamed Elsewhere' not in client.get('/venues/1').get_data(as_text=True)
+    make_cache(app.config).bump_version()
+    assert 'Renamed Elsewhere' in client.get('/venues/1').get_data(as_text=True)
@@ -0,0 +1,63 @@
+import pytest
+from flask import Flask, redirect, request
+from models import db, Venue
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    # A primary and two replicas as SQLite stand-ins, each holding one venue
+    # named after the database it lives in.
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "primary.db"}',
+        SQLALCHEMY_REPLICA_URIS=[f'sqlite:///{tmp_path / "replica_0.db"}',
+                                 f'sqlite:///{tmp_path / "replica_1.db"}'],
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        REPLICA_READ_AFTER_WRITE_SECONDS=10,
+        REPLICA_HEALTH_RETRY_SECONDS=30,
+    )
+    db.init_app(app)
+    # The router belongs to the shared db object; start each test afresh.
+    db.router.keys = None
+    db.router.down.clear()
+
+    @app.route('/names')
+    def names():
+        return ','.join(venue.name for venue in Venue.query.order_by(Venue.id))
+
+    @app.route('/names', methods=['POST'])
+    def add_name():
+        db.session.add(Venue(name=request.form['name']))
+        db.session.commit()
+        return redirect('/names')
+
+    with app.app_context():
+        for key in (None, 'replica_0', 'replica_1'):
+            engine = db.get_engine(app, bind=key)
+            db.metadata.create_all(engine)
+            engine.execute(Venue.__table__.insert(), {"name": key or 'primary'})
+    return app
+
+
+def test_reads_go_round_robin_to_the_replicas(replicated):
+    client = replicated.test_client()
+    assert [client.get('/names').get_data(as_text=True) for _ in range(4)] == \
+        ['replica_0', 'replica_1', 'replica_0', 'replica_1']
+
+
+def test_writes_and_the_reads_after_them_stay_on_the_primary(replicated):
+    client = replicated.test_client()
+    response = client.post('/names', data={"name": 'new'}, follow_redirects=True)
+    assert response.get_data(as_text=True) == 'primary,new'
+    assert client.get('/names').get_data(as_text=True) == 'primary,new'
+    assert replicated.test_client().get('/names').get_data(as_text=True) == 'replica_0'
+
+
+def test_a_failing_replica_leaves_the_rotation(replicated, tmp_path):
+    replicated.config['SQLALCHEMY_BINDS']['replica_1'] = f'sqlite:///{tmp_path / "gone" / "replica_1.db"}'
+    client = replicated.test_client()
+    assert client.get('/names').get_data(as_text=True) == 'replica_0'
+    assert client.get('/names').status_code == 500
+    assert [client.get('/names').get_data(as_text=True) for _ in range(3)] == ['replica_0'] * 3
+    assert db.router.stats()['down'] == ['replica_1']
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+from models import db, Venue, Artist
+
+
+def booking(venue_id, artist_id, start_time, **extra):
+    return dict(venue_id=venue_id, artist_id=artist_id, start_time=start_time.isoformat(), **extra)
+
+
+def test_schedule_statuses(client, app):
+    db.session.add_all([Venue(name='Hall'), Artist(name='Band')])
+    db.session.commit()
+    start = datetime.now().replace(microsecond=0) + timedelta(days=7)
+
+    response = client.post('/shows/schedule', json={"shows": [booking(1, 1, start)]})
+    assert response.status_code == 201
+
+    response = client.post('/shows/schedule', json={"shows": [booking(1, 1, start + timedelta(hours=1))]})
+    assert response.status_code == 409
+    assert response.get_json()['results'][0]['status'] == 'conflict'
+
+    response = client.post('/shows/schedule', json={"shows": [
+        booking(1, 1, start + timedelta(days=1)),
+        booking(1, 1, start),
+    ]})
+    assert response.status_code == 200
+
+    response = client.post('/shows/schedule', json={"shows": [
+        booking(99, 1, start + timedelta(days=2)),
+        {"venue_id": 1, "artist_id": 1, "start_time": 'next tuesday'},
+    ]})
+    assert response.status_code == 400
+    assert [result['status'] for result in response.get_json()['results']] == ['invalid', 'invalid']
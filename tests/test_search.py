@@ -0,0 +1,34 @@
+from cache import make_cache
+from models import db, Venue
+from search import search_names
+
+
+def found(term):
+    return [match['name'] for match in search_names(Venue, term)['data']]
+
+
+def test_committed_names_are_searchable(app):
+    db.session.add(Venue(name='The Musical Hop'))
+    db.session.commit()
+    assert found('music') == ['The Musical Hop']
+    venue = Venue.query.get(1)
+    venue.name = 'Park Square Live Music'
+    db.session.commit()
+    assert found('hop') == []
+    assert found('square') == ['Park Square Live Music']
+
+
+def test_rolled_back_writes_never_show(app):
+    assert found('music') == []
+    db.session.add(Venue(name='The Musical Hop'))
+    db.session.flush()
+    db.session.rollback()
+    assert found('music') == []
+
+
+def test_writes_from_other_processes_rebuild_the_index(app):
+    assert found('music') == []
+    db.session.execute(Venue.__table__.insert(), {"name": 'The Musical Hop'})
+    db.session.commit()
+    make_cache(app.config).bump_version()
+    assert found('music') == ['The Musical Hop']
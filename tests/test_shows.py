@@ -0,0 +1,31 @@
+import html
+import re
+from sqlstats import assert_max_queries
+from conftest import clear_caches
+
+NEXT_PAGE = re.compile(r'<li class="next"><a href="([^"]+)"')
+
+
+def test_show_feed_is_one_query_however_many_shows(client, seeded):
+    seeded(200)
+    with assert_max_queries(1) as small:
+        assert client.get('/shows').status_code == 200
+
+    seeded(2000)
+    with assert_max_queries(1) as large:
+        assert client.get('/shows').status_code == 200
+    assert small.count == large.count == 1
+
+
+def test_every_feed_page_is_one_query(client, seeded):
+    seeded(120)
+    url, pages = '/shows', 0
+    while url:
+        clear_caches()
+        with assert_max_queries(1):
+            response = client.get(url)
+        assert response.status_code == 200
+        pages += 1
+        link = NEXT_PAGE.search(response.get_data(as_text=True))
+        url = html.unescape(link.group(1)) if link else None
+    assert pages == 3
@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models import db
+from sqlstats import QueryBudgetExceeded, assert_max_queries
+
+
+def test_server_timing_names_statements_only_when_asked(app, client, seeded):
+    seeded(50)
+    app.debug = False
+    header = client.get('/venues/1').headers['Server-Timing']
+    assert header.startswith('db;dur=') and 'sql-1' not in header
+    app.config['SERVER_TIMING_SQL'] = True
+    header = client.get('/artists/1').headers['Server-Timing']
+    assert 'sql-1;dur=' in header and 'SELECT' in header
+
+
+def test_failed_statements_leave_no_timers_behind(app):
+    connection = db.session.connection()
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM no_such_table'))
+    assert not connection.info.get('query_started')
+
+
+def test_views_over_their_budget_fail(app, client, seeded, monkeypatch):
+    # The app fixture enforces budgets, so every test request checks its view.
+    seeded(50)
+    import app as fyyur
+    feed = fyyur.show_feed
+    monkeypatch.setattr(fyyur, 'show_feed', lambda **kwargs: (db.session.execute('SELECT 1'), feed(**kwargs))[1])
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/shows')
+
+
+def test_assert_max_queries_counts_every_statement(app):
+    with pytest.raises(QueryBudgetExceeded):
+        with assert_max_queries(1):
+            db.session.execute('SELECT 1')
+            db.session.execute('SELECT 2')